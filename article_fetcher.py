@@ -0,0 +1,280 @@
+import os
+import re
+import time
+import base64
+import codecs
+import threading
+from collections import Counter
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+import storage
+import pipeline
+
+# Optional enrichment for news articles: resolve the Google News redirect,
+# download the article with a bounded worker pool (and a per-host limit so
+# one publisher isn't hammered), keep the main text up to a token budget and
+# cache it by URL so re-runs don't download anything twice.
+ARTICLE_WORKERS = int(os.environ.get("NEWS_ARTICLE_WORKERS", "16"))
+ARTICLE_PER_HOST = int(os.environ.get("NEWS_ARTICLE_PER_HOST", "2"))
+ARTICLE_HOST_INTERVAL = float(os.environ.get("NEWS_ARTICLE_HOST_INTERVAL", "0.25"))
+# Almost every link is a news.google.com redirect; resolving one is a small request, so
+# that host gets its own higher limit and the per-host limit applies to the publisher
+GOOGLE_NEWS_HOST = "news.google.com"
+ARTICLE_REDIRECT_PER_HOST = int(os.environ.get("NEWS_ARTICLE_REDIRECT_PER_HOST", str(ARTICLE_WORKERS)))
+ARTICLE_TIMEOUT = float(os.environ.get("NEWS_ARTICLE_TIMEOUT", "10"))
+ARTICLE_TOKENS = int(os.environ.get("NEWS_ARTICLE_TOKENS", "600"))
+ARTICLE_MAX_BYTES = int(os.environ.get("NEWS_ARTICLE_MAX_BYTES", str(2 * 1024 * 1024)))
+ARTICLE_CACHE_DAYS = float(os.environ.get("NEWS_ARTICLE_CACHE_DAYS", "14"))
+# Failed downloads are retried sooner than successful ones are refreshed
+ARTICLE_FAILURE_HOURS = float(os.environ.get("NEWS_ARTICLE_FAILURE_HOURS", "12"))
+ARTICLE_USER_AGENT = "Mozilla/5.0 (compatible; DelawareScout/1.0)"
+
+# Text inside these tags is never article body
+SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "button", "svg", "figure"}
+TEXT_TAGS = {"p", "h1", "h2", "h3", "li", "blockquote"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Paragraphs shorter than this are usually bylines, captions or share buttons
+MIN_PARAGRAPH_CHARS = 40
+
+def decode_google_news_url(url):
+    # Older Google News article ids are base64 protobufs that embed the publisher URL;
+    # newer ("AU_yqL...") ids don't, and are resolved over HTTP instead
+    parts = urlsplit(url)
+    if parts.netloc != GOOGLE_NEWS_HOST or "/articles/" not in parts.path:
+        return url
+    article_id = parts.path.rsplit("/", 1)[-1]
+    try:
+        decoded = base64.urlsafe_b64decode(article_id + "=" * (-len(article_id) % 4))
+    except (ValueError, TypeError):
+        return None
+    match = re.search(rb"https?://[\x21-\x7e]+", decoded)
+    if not match or match.group().startswith(b"https://" + GOOGLE_NEWS_HOST.encode("ascii")):
+        return None
+    return match.group().decode("ascii")
+
+class ArticleTextParser(HTMLParser):
+    # Collects paragraph-like text outside navigation/boilerplate and stops once
+    # `max_chars` are collected, so callers can stop feeding the download early
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.paragraphs = []
+        self.size = 0
+        self.skip_depth = 0
+        self.text_depth = 0
+        self.current = []
+        self.canonical = None
+
+    @property
+    def done(self):
+        return self.size >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a" and self.canonical is None:
+            # Google News interstitial pages carry the publisher link as data-n-au
+            attrs = dict(attrs)
+            if attrs.get("data-n-au"):
+                self.canonical = attrs["data-n-au"]
+        if tag in VOID_TAGS:
+            return
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in TEXT_TAGS and not self.skip_depth:
+            self.text_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag in TEXT_TAGS and self.text_depth:
+            self.text_depth -= 1
+            if not self.text_depth:
+                self._end_paragraph()
+
+    def handle_data(self, data):
+        if self.text_depth and not self.skip_depth and not self.done:
+            self.current.append(data)
+
+    def _end_paragraph(self):
+        text = re.sub(r"\s+", " ", "".join(self.current)).strip()
+        self.current = []
+        if len(text) >= MIN_PARAGRAPH_CHARS:
+            self.paragraphs.append(text)
+            self.size += len(text) + 1
+
+    def text(self):
+        text = "\n".join(self.paragraphs)
+        if len(text) <= self.max_chars:
+            return text
+        # Cut on a word boundary
+        return text[:self.max_chars].rsplit(" ", 1)[0] + " …"
+
+class HostLimiter:
+    # At most ARTICLE_PER_HOST downloads per host at once, ARTICLE_HOST_INTERVAL apart;
+    # `overrides` maps a host to its own (per_host, interval)
+    def __init__(self, per_host=ARTICLE_PER_HOST, interval=ARTICLE_HOST_INTERVAL, overrides=None):
+        self.per_host = per_host
+        self.interval = interval
+        self.overrides = overrides or {}
+        self.lock = threading.Lock()
+        self.semaphores = {}
+        self.next_start = {}
+
+    def slot(self, host):
+        with self.lock:
+            if host not in self.semaphores:
+                per_host = self.overrides.get(host, (self.per_host, self.interval))[0]
+                self.semaphores[host] = threading.BoundedSemaphore(per_host)
+            semaphore = self.semaphores[host]
+        return _HostSlot(self, host, semaphore)
+
+    def wait_turn(self, host):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start.get(host, now))
+            self.next_start[host] = start + self.overrides.get(host, (self.per_host, self.interval))[1]
+        if start > now:
+            time.sleep(start - now)
+
+class _HostSlot:
+    def __init__(self, limiter, host, semaphore):
+        self.limiter, self.host, self.semaphore = limiter, host, semaphore
+
+    def __enter__(self):
+        self.semaphore.acquire()
+        self.limiter.wait_turn(self.host)
+
+    def __exit__(self, *exc):
+        self.semaphore.release()
+
+class ArticleCache:
+    def __init__(self):
+        self.conn = storage.connect("articles", check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                final_url TEXT,
+                body TEXT,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, url):
+        # Returns the cached row (body is None for a recent failure), or None if stale/missing
+        with self.lock:
+            row = self.conn.execute("SELECT final_url, body, fetched_at FROM articles WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        max_age = ARTICLE_CACHE_DAYS * 86400 if row["body"] is not None else ARTICLE_FAILURE_HOURS * 3600
+        return row if time.time() - row["fetched_at"] < max_age else None
+
+    def store(self, url, final_url, body):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO articles (url, final_url, body, fetched_at) VALUES (?, ?, ?, ?)",
+                (url, final_url, body, time.time()),
+            )
+
+    def close(self):
+        with self.lock:
+            cutoff = time.time() - ARTICLE_CACHE_DAYS * 86400
+            self.conn.execute("DELETE FROM articles WHERE fetched_at < ?", (cutoff,))
+            self.conn.commit()
+            self.conn.close()
+
+def _download_text(session, limiter, url, max_chars):
+    # Streams the page through the parser and stops as soon as the budget is filled
+    with limiter.slot(urlsplit(url).netloc):
+        with session.get(url, timeout=ARTICLE_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            parser = ArticleTextParser(max_chars)
+            received = 0
+            # requests assumes ISO-8859-1 when no charset is given; news sites are almost always UTF-8
+            charset = response.encoding if "charset" in response.headers.get("Content-Type", "") else "utf-8"
+            try:
+                decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            for chunk in response.iter_content(chunk_size=16384):
+                received += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.done or received >= ARTICLE_MAX_BYTES:
+                    break
+            pipeline.record(bytes=received)
+            return response.url, parser
+
+def resolve_article_url(session, limiter, url):
+    # Returns the publisher URL behind a Google News link, or None when it can't be found.
+    # Redirects are not followed here, so the publisher is only contacted under its own limit.
+    decoded = decode_google_news_url(url)
+    if decoded is not None or urlsplit(url).netloc != GOOGLE_NEWS_HOST:
+        return decoded
+    with limiter.slot(GOOGLE_NEWS_HOST):
+        with session.get(url, timeout=ARTICLE_TIMEOUT, stream=True, allow_redirects=False) as response:
+            if response.is_redirect:
+                return urljoin(url, response.headers["Location"])
+            response.raise_for_status()
+            # The interstitial page names the publisher in its first few kilobytes
+            parser = ArticleTextParser(0)
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            received = 0
+            for chunk in response.iter_content(chunk_size=16384):
+                received += len(chunk)
+                parser.feed(decoder.decode(chunk))
+                if parser.canonical or received >= ARTICLE_MAX_BYTES:
+                    break
+            pipeline.record(bytes=received)
+            return parser.canonical
+
+def fetch_article(session, limiter, url, max_chars):
+    # Returns (final_url, body); body is "" when nothing article-like was found
+    target = resolve_article_url(session, limiter, url)
+    if target is None:
+        raise ValueError(f"could not resolve the publisher link behind {url}")
+    final_url, parser = _download_text(session, limiter, target, max_chars)
+    return final_url, parser.text()
+
+def enrich_articles(articles, max_tokens=ARTICLE_TOKENS, use_cache=True):
+    # Adds a "body" excerpt to each article whose page could be fetched; order is kept
+    import requests
+    max_chars = max_tokens * 4  # same ~4 characters per token estimate as the analysis chunker
+    cache = ArticleCache() if use_cache else None
+    limiter = HostLimiter(overrides={GOOGLE_NEWS_HOST: (ARTICLE_REDIRECT_PER_HOST, 0.0)})
+
+    def enrich(article):
+        # Returns (status, article) so the counts are tallied on the main thread
+        url = article.get("link")
+        if not url:
+            return "failed", article
+        cached = cache.get(url) if cache else None
+        if cached is not None:
+            return "cached", {**article, "body": cached["body"]} if cached["body"] else article
+        try:
+            final_url, body = fetch_article(session, limiter, url, max_chars)
+        except Exception:
+            if cache:
+                cache.store(url, None, None)
+            return "failed", article
+        if cache:
+            cache.store(url, final_url, body)
+        return "fetched", {**article, "body": body} if body else article
+
+    try:
+        with requests.Session() as session:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=ARTICLE_WORKERS, pool_maxsize=max(ARTICLE_PER_HOST, ARTICLE_REDIRECT_PER_HOST))
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = ARTICLE_USER_AGENT
+            with ThreadPoolExecutor(max_workers=ARTICLE_WORKERS) as pool:
+                results = list(pool.map(enrich, articles))
+    finally:
+        if cache:
+            cache.close()
+
+    enriched = [article for _, article in results]
+    counts = Counter(status for status, _ in results)
+    with_body = sum(1 for article in enriched if article.get("body"))
+    print(f"Article bodies: {with_body}/{len(articles)} extracted "
+          f"({counts['cached']} cached, {counts['fetched']} downloaded, {counts['failed']} failed)")
+    return enriched
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import random
+import socket
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+# Local stand-ins for Google News RSS, the xAI chat completions API and the
+# Supabase/Lovable webhooks, so the pipelines can be benchmarked offline.
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+HEADLINE_TEMPLATES = [
+    "Planning commission approves {n}-unit apartment complex in {town}",
+    "New medical office building proposed near {town} hospital",
+    "{town} school district unveils design for new elementary school",
+    "DelDOT to begin repaving Route {n} near {town}",
+    "Hotel developer seeks zoning change in {town}",
+    "Senior living campus planned on former farm outside {town}",
+    "{town} council reviews site plan for mixed-use retail center",
+    "Home sells for ${n}00,000 in {town}",
+]
+TOWNS = ["Wilmington", "Dover", "Newark", "Middletown", "Smyrna", "Milford", "Lewes", "Seaford", "Rehoboth Beach"]
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+def headline(feed, item):
+    template = HEADLINE_TEMPLATES[(feed + item) % len(HEADLINE_TEMPLATES)]
+    return template.format(n=(feed * 7 + item) % 90 + 10, town=TOWNS[(feed * 3 + item) % len(TOWNS)])
+
+class FakeServices:
+    # Starts the three fake services on ephemeral localhost ports:
+    #   rss_url(i)      - RSS feed i with `items_per_feed` items, served after `rss_latency` seconds
+    #   llm_base_url    - OpenAI-compatible /chat/completions that answers from the news_item fixture,
+    #                     streamed as SSE; with `malformed` some objects are broken or truncated
+    #   webhook_url     - accepts POSTs, failing with 503 at `webhook_failure_rate`
+    #   /article/...    - a news article page (boilerplate plus body paragraphs) after `article_latency`
+    def __init__(self, items_per_feed=10, rss_latency=0.05, llm_latency=0.2, malformed=False,
+                 webhook_failure_rate=0.0, article_latency=0.1, seed=1):
+        self.items_per_feed = items_per_feed
+        self.rss_latency = rss_latency
+        self.article_latency = article_latency
+        self.llm_latency = llm_latency
+        self.malformed = malformed
+        self.webhook_failure_rate = webhook_failure_rate
+        self.random = random.Random(seed)
+        self.news_item = json.loads(load_fixture("news_item.json"))
+        self.stats = {"rss_requests": 0, "llm_requests": 0, "webhook_requests": 0, "webhook_bytes": 0, "webhook_failures": 0, "article_requests": 0}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def __enter__(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out as separate writes; don't let Nagle add latency
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.startswith("/feed/"):
+                    services._serve_feed(self, int(self.path.split("/")[2]))
+                elif self.path.startswith("/article/"):
+                    services._serve_article(self, self.path)
+                else:
+                    self._reply(404, b"not found")
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.endswith("/chat/completions"):
+                    services._serve_completion(self, json.loads(body))
+                elif self.path.startswith("/webhook"):
+                    services._serve_webhook(self, body)
+                else:
+                    self._reply(404, b"not found")
+
+            def _reply(self, status, body, content_type="text/plain", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        self.llm_base_url = f"{self.base_url}/v1"
+        self.webhook_url = f"{self.base_url}/webhook"
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def rss_url(self, feed):
+        return f"{self.base_url}/feed/{feed}"
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _serve_feed(self, handler, feed):
+        self._count("rss_requests")
+        time.sleep(self.rss_latency)
+        etag = f'"feed-{feed}"'
+        if handler.headers.get("If-None-Match") == etag:
+            handler._reply(304, b"", headers={"ETag": etag})
+            return
+        items = "".join(
+            f"<item><title>{escape(headline(feed, item))} - Delaware News</title>"
+            f"<link>{self.base_url}/article/{feed}/{item}</link>"
+            f"<pubDate>{formatdate(1767000000 - item * 3600, usegmt=True)}</pubDate></item>"
+            for item in range(self.items_per_feed)
+        )
+        body = f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {feed}</title>{items}</channel></rss>'
+        handler._reply(200, body.encode("utf-8"), "application/rss+xml", {"ETag": etag})
+
+    def _serve_article(self, handler, path):
+        self._count("article_requests")
+        time.sleep(self.article_latency)
+        paragraphs = "".join(
+            f"<p>The {n * 12},000 square foot project at {path} is estimated at ${n * 3} million. "
+            f"Becker Morgan Group is the architect and EDiS Company is expected to serve as contractor.</p>"
+            for n in range(1, 30)
+        )
+        body = (
+            "<html><head><title>Article</title><script>var tracking = {};</script></head><body>"
+            "<header><nav><a href='/'>Home</a><p>Subscribe to our newsletter for daily updates and more!</p></nav></header>"
+            f"<article><h1>Project update</h1><p>By Staff</p>{paragraphs}</article>"
+            "<footer><p>Copyright Delaware News. All rights reserved. Terms of service apply.</p></footer></body></html>"
+        )
+        handler._reply(200, body.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _completion_text(self, request):
+        # Answer like the recorded analysis: one item per building-related headline
+        prompt = request["messages"][-1]["content"]
+        headlines = json.loads(prompt[prompt.index("Headlines:") + len("Headlines:"):].strip())
+        items = []
+        for i, article in enumerate(headlines):
+            title = article.get("title") or ""
+            if "repaving" in title or "sells for" in title:
+                continue
+            item = dict(self.news_item, title=title, source_url=article.get("link"))
+            text = json.dumps(item, indent=2)
+            if self.malformed and i % 25 == 7:
+                text = text.replace('"sector": "Healthcare"', '"sector": Healthcare')
+            items.append(text)
+        text = "```json\n[\n" + ",\n".join(items) + ",\n]\n```"
+        with self._lock:
+            truncate = self.malformed and items and self.random.random() < 0.1
+        if truncate:
+            # Occasionally cut the answer off mid-object, like a max_tokens stop
+            text = text[: int(len(text) * 0.8)]
+        return text
+
+    def _serve_completion(self, handler, request):
+        self._count("llm_requests")
+        time.sleep(self.llm_latency)
+        text = self._completion_text(request)
+        usage = {"prompt_tokens": len(json.dumps(request["messages"])) // 4, "completion_tokens": len(text) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": request.get("model")}
+
+        if not request.get("stream"):
+            body = dict(base, object="chat.completion", usage=usage, choices=[
+                {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            ])
+            handler._reply(200, json.dumps(body).encode("utf-8"), "application/json")
+            return
+
+        events = []
+        for start in range(0, len(text), 200):
+            chunk = dict(base, object="chat.completion.chunk", choices=[
+                {"index": 0, "delta": {"content": text[start:start + 200]}, "finish_reason": None}
+            ])
+            events.append(f"data: {json.dumps(chunk)}\n\n")
+        final = dict(base, object="chat.completion.chunk", usage=usage, choices=[
+            {"index": 0, "delta": {}, "finish_reason": "stop"}
+        ])
+        events.append(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n")
+        handler._reply(200, "".join(events).encode("utf-8"), "text/event-stream")
+
+    def _serve_webhook(self, handler, body):
+        self._count("webhook_requests")
+        self._count("webhook_bytes", len(body))
+        with self._lock:
+            fail = self.random.random() < self.webhook_failure_rate
+        if fail:
+            self._count("webhook_failures")
+            handler._reply(503, b"unavailable")
+        else:
+            handler._reply(200, b'{"ok": true}', "application/json")
@@ -0,0 +1,207 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+
+# Offline benchmarks for the scout pipelines against local stand-ins (benchmarks/fakes.py).
+#
+#   python benchmarks/run_benchmarks.py                      # 10x, 100x, 1000x current volumes
+#   python benchmarks/run_benchmarks.py --scales 1 10 --compare benchmarks/results/<commit>.json
+#
+# Results are written to benchmarks/results/<commit>.json for comparison between commits.
+# xai_sdk talks gRPC, so get_leads is measured from its recorded streamed response
+# through the same parser + validate_leads path rather than through a fake server.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks.fakes import FakeServices, load_fixture  # noqa: E402
+
+# Today's volumes: 14 feeds x 10 entries, ~10 leads per weekly run
+CURRENT_FEEDS = 14
+CURRENT_LEADS = 10
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def timed(func, *args, **kwargs):
+    # Runs func quietly (the scouts print per item) and returns (seconds, result)
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+def synthetic_articles(services, count):
+    from benchmarks.fakes import headline
+    return [
+        {"title": f"{headline(i // 10, i % 10)} - Delaware News", "link": f"{services.base_url}/article/{i}", "published": "Mon, 05 Jan 2026 12:00:00 GMT"}
+        for i in range(count)
+    ]
+
+def scaled_leads_response(scale, malformed=False):
+    # The recorded response repeated `scale` times with distinct names/addresses, re-emitted as model text
+    from json_stream import parse_json_objects
+    recorded = parse_json_objects(load_fixture("leads_response.txt"))
+    leads = []
+    for copy in range(scale * CURRENT_LEADS // len(recorded)):
+        for lead in recorded:
+            lead = dict(lead, name=f"{lead['name']} Copy {copy}")
+            if lead["address"] != "Site location TBD":
+                lead["address"] = f"{copy}{lead['address']}"
+            leads.append(json.dumps(lead, indent=2))
+    text = "```json\n[\n" + ",\n".join(leads) + ",\n]\n```"
+    if malformed:
+        text += "\n" + load_fixture("leads_malformed.txt")
+    return text
+
+def stream_chunks(text, size=64):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+def bench_get_delaware_news(services, scale):
+    import news_scraper
+    sources = [services.rss_url(i) for i in range(CURRENT_FEEDS * scale)]
+    seconds, articles = timed(news_scraper.get_delaware_news, use_cache=False, sources=sources)
+    return {"seconds": seconds, "feeds": len(sources), "articles": len(articles)}
+
+def bench_analyze_news(services, scale):
+    import news_scraper
+    articles = synthetic_articles(services, CURRENT_FEEDS * 10 * scale)
+    before = services.stats["llm_requests"]
+    seconds, results = timed(news_scraper.analyze_news_with_grok, articles)
+    return {"seconds": seconds, "articles": len(articles), "results": len(results), "requests": services.stats["llm_requests"] - before}
+
+def bench_enrich_articles(services, scale):
+    import article_fetcher
+    articles = synthetic_articles(services, CURRENT_FEEDS * 10 * scale)
+    before = services.stats["article_requests"]
+    seconds, enriched = timed(article_fetcher.enrich_articles, articles, use_cache=False)
+    return {
+        "seconds": seconds,
+        "articles": len(articles),
+        "with_body": sum(1 for article in enriched if article.get("body")),
+        "requests": services.stats["article_requests"] - before,
+    }
+
+def bench_cluster_articles(services, scale):
+    from clustering import cluster_articles
+    # Fake feeds reuse headline templates with other towns and numbers; only exact repeats are one story
+    articles = synthetic_articles(services, CURRENT_FEEDS * 10 * scale)
+    seconds, stories = timed(cluster_articles, articles)
+    return {"seconds": seconds, "articles": len(articles), "stories": len(stories)}
+
+def bench_validate_leads(services, scale, malformed=False):
+    import spectrum_scout
+    from json_stream import JSONObjectStream, iter_json_objects
+    text = scaled_leads_response(scale, malformed)
+    stream = JSONObjectStream()
+    seconds, validated = timed(spectrum_scout.validate_leads, iter_json_objects(stream_chunks(text), stream))
+    return {"seconds": seconds, "bytes": len(text), "validated": len(validated), "malformed_objects": stream.errors}
+
+def bench_upload(services, scale):
+    import storage
+    import uploader
+    records = [{"title": article["title"], "source_url": article["link"]}
+               for article in synthetic_articles(services, CURRENT_FEEDS * 10 * scale)]
+    # A fresh manifest per scale: the first run sends everything, the second finds nothing changed
+    cache_dir = storage.CACHE_DIR
+    with tempfile.TemporaryDirectory() as manifest_dir:
+        storage.CACHE_DIR = manifest_dir
+        try:
+            before = dict(services.stats)
+            seconds, delivered = timed(uploader.upload_delta, services.webhook_url, "news", records)
+            middle = dict(services.stats)
+            unchanged_seconds, _ = timed(uploader.upload_delta, services.webhook_url, "news", records)
+        finally:
+            storage.CACHE_DIR = cache_dir
+    return {
+        "seconds": seconds,
+        "records": len(records),
+        "delivered": delivered,
+        "requests": middle["webhook_requests"] - before["webhook_requests"],
+        "bytes": middle["webhook_bytes"] - before["webhook_bytes"],
+        "failures": middle["webhook_failures"] - before["webhook_failures"],
+        "unchanged_seconds": unchanged_seconds,
+        "unchanged_requests": services.stats["webhook_requests"] - middle["webhook_requests"],
+    }
+
+BENCHMARKS = {
+    "get_delaware_news": bench_get_delaware_news,
+    "analyze_news_with_grok": bench_analyze_news,
+    "enrich_articles": bench_enrich_articles,
+    "cluster_articles": bench_cluster_articles,
+    "validate_leads": bench_validate_leads,
+    "validate_leads_malformed": lambda services, scale: bench_validate_leads(services, scale, malformed=True),
+    "upload": bench_upload,
+}
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline.get('commit')} ({baseline_path}):")
+    for name, by_scale in results["results"].items():
+        for scale, result in by_scale.items():
+            old = baseline.get("results", {}).get(name, {}).get(scale)
+            if old:
+                ratio = result["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+                print(f"  {name:<26} {scale:>5}x  {old['seconds']:8.3f}s -> {result['seconds']:8.3f}s  ({ratio:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scout benchmarks")
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000], help="multiples of current volumes")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--rss-latency", type=float, default=0.05, help="seconds per fake feed response")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before each fake completion")
+    parser.add_argument("--malformed", action="store_true", help="fake LLM returns some broken/truncated JSON")
+    parser.add_argument("--webhook-failure-rate", type=float, default=0.02)
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cache_dir, FakeServices(
+        rss_latency=args.rss_latency, llm_latency=args.llm_latency,
+        malformed=args.malformed, webhook_failure_rate=args.webhook_failure_rate,
+    ) as services:
+        # Point the scouts at the fakes before they are imported
+        os.environ.update({
+            "SCOUT_CACHE_DIR": cache_dir,
+            "XAI_API_KEY": os.environ.get("XAI_API_KEY", "benchmark"),
+            "XAI_BASE_URL": services.llm_base_url,
+            "SCOUT_UPLOAD_BACKOFF": "0.01",
+            # Every fake article is on one local host, so the per-host politeness limits are lifted
+            "NEWS_ARTICLE_PER_HOST": "16",
+            "NEWS_ARTICLE_HOST_INTERVAL": "0",
+        })
+        import response_cache
+        response_cache.CACHE_MODE = "off"
+
+        results = {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+                   "settings": vars(args), "results": {}}
+        for name, bench in BENCHMARKS.items():
+            if args.only and name not in args.only:
+                continue
+            for scale in args.scales:
+                result = bench(services, scale)
+                results["results"].setdefault(name, {})[str(scale)] = result
+                details = ", ".join(f"{key}={value}" for key, value in result.items() if key != "seconds")
+                print(f"{name:<26} {scale:>5}x  {result['seconds']:8.3f}s  {details}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{results['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved results to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
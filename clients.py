@@ -0,0 +1,41 @@
+import os
+import threading
+
+# One lazily built client per process. The SDKs are only imported the first
+# time a scout actually talks to the model, so `--help`, cache hits and the
+# other scouts don't pay their import cost.
+
+_lock = threading.Lock()
+_clients = {}
+
+def xai_client():
+    with _lock:
+        if "xai" not in _clients:
+            from xai_sdk import Client
+            _clients["xai"] = Client(api_key=os.environ.get("XAI_API_KEY"))
+        return _clients["xai"]
+
+def openai_client():
+    # Grok through the OpenAI-compatible endpoint
+    with _lock:
+        if "openai" not in _clients:
+            from openai import OpenAI
+            _clients["openai"] = OpenAI(
+                api_key=os.environ.get("XAI_API_KEY"),
+                base_url=os.environ.get("XAI_BASE_URL", "https://api.x.ai/v1"),
+            )
+        return _clients["openai"]
+
+def xai_chat(model, system_prompt=None, user_prompt=None, web_search=True, **kwargs):
+    # An xai_sdk chat with web search enabled and the given messages appended
+    from xai_sdk.chat import system, user
+    from xai_sdk.tools import web_search as web_search_tool
+
+    if web_search:
+        kwargs["tools"] = [web_search_tool()]
+    chat = xai_client().chat.create(model=model, **kwargs)
+    if system_prompt:
+        chat.append(system(system_prompt))
+    if user_prompt:
+        chat.append(user(user_prompt))
+    return chat
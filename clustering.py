@@ -0,0 +1,121 @@
+import os
+import re
+import random
+import hashlib
+from seen_articles import headline_text, normalize_title
+from relevance import STOPWORDS
+from geo import COUNTY_POLYGONS, TOWN_CENTROIDS
+
+# Near-duplicate story clustering: the same story syndicated by several
+# outlets arrives under different Google News links and slightly different
+# titles. Titles are MinHashed, LSH banding finds candidate pairs in linear
+# time, candidates are confirmed by exact word Jaccard and merged with
+# union-find; each cluster keeps its first article with every source attached.
+# Local news reuses headline templates ("approves 120-unit apartment complex
+# in Dover"), so titles whose numbers or places differ are never folded;
+# a copy that only adds one ("..., Kent County", "... near Route 13") still is.
+
+# Word Jaccard similarity at which two titles are the same story
+CLUSTER_THRESHOLD = float(os.environ.get("NEWS_CLUSTER_THRESHOLD", "0.6"))
+# 10 bands of 3 rows puts the LSH candidate threshold at about (1/10)^(1/3) = 0.46
+LSH_BANDS = 10
+LSH_ROWS = 3
+# Titles with fewer distinct words than this only cluster on an exact match
+MIN_SHINGLES = 3
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260101)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(LSH_BANDS * LSH_ROWS)]
+
+def shingles(title):
+    return {word for word in normalize_title(headline_text(title)).split() if word not in STOPWORDS}
+
+_PLACE_PATTERN = re.compile(r"\b(?:" + "|".join(
+    sorted({name.lower() for name in [*TOWN_CENTROIDS, *COUNTY_POLYGONS]}, key=len, reverse=True)
+) + r")\b")
+
+def places(title):
+    return set(_PLACE_PATTERN.findall(normalize_title(headline_text(title))))
+
+def numbers(title):
+    return set(re.findall(r"\d+", headline_text(title)))
+
+def minhash(words):
+    hashes = [int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "big") for word in words]
+    return [min([(a * h + b) % _PRIME for h in hashes]) for a, b in _PERMUTATIONS]
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def _find(parents, i):
+    while parents[i] != i:
+        parents[i] = parents[parents[i]]
+        i = parents[i]
+    return i
+
+def _differ(a, b):
+    return bool(a and b and not (a <= b or b <= a))
+
+def _conflict(a, b):
+    # Same template, different project: another number ("120-unit" / "60-unit") or another town
+    return _differ(a["numbers"], b["numbers"]) or _differ(a["places"], b["places"])
+
+def cluster_articles(articles, threshold=CLUSTER_THRESHOLD):
+    # Returns one article per story, in original order. When a story has more than
+    # one article, its representative gets "sources": [{title, link, published}, ...].
+    words = [shingles(article.get("title")) for article in articles]
+    parents = list(range(len(articles)))
+    # Numbers and places of every member, kept on the cluster root; checking new
+    # members against the union stops a vaguer title chaining two projects
+    details = [{"numbers": numbers(article.get("title")), "places": places(article.get("title"))} for article in articles]
+    buckets = {}
+    identical = {}
+    for i, article_words in enumerate(words):
+        # The same words mean the same numbers and places, so no LSH scan is needed;
+        # this is also the only way short titles cluster
+        first = identical.setdefault(frozenset(article_words), i) if article_words else i
+        if first != i:
+            parents[i] = _find(parents, first)
+            continue
+        keys = []
+        if len(article_words) >= MIN_SHINGLES:
+            signature = minhash(article_words)
+            keys = [(band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])) for band in range(LSH_BANDS)]
+        # Merging only grows the sets, so a conflicting cluster stays conflicting
+        conflicting, compared = set(), set()
+        for key in keys:
+            bucket = buckets.setdefault(key, [])
+            # Check every member, not just the first: union-find alone would chain unlike titles
+            for other in bucket:
+                if other in compared:
+                    continue
+                compared.add(other)
+                root, other_root = _find(parents, i), _find(parents, other)
+                if root == other_root or other_root in conflicting or jaccard(words[other], article_words) < threshold:
+                    continue
+                if _conflict(details[root], details[other_root]):
+                    conflicting.add(other_root)
+                    continue
+                parents[root] = other_root
+                details[other_root]["numbers"] |= details[root]["numbers"]
+                details[other_root]["places"] |= details[root]["places"]
+            bucket.append(i)
+
+    clusters = {}
+    for i in range(len(articles)):
+        clusters.setdefault(_find(parents, i), []).append(i)
+
+    representatives = []
+    for members in sorted(clusters.values()):
+        article = articles[members[0]]
+        if len(members) > 1:
+            article = {**article, "sources": [
+                {"title": articles[i].get("title"), "link": articles[i].get("link"), "published": articles[i].get("published")}
+                for i in members
+            ]}
+        representatives.append(article)
+
+    if len(representatives) < len(articles):
+        print(f"Clustered {len(articles)} headlines into {len(representatives)} stories "
+              f"({len(articles) - len(representatives)} near-duplicates folded).")
+    return representatives
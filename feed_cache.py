@@ -0,0 +1,63 @@
+import os
+import json
+import time
+import storage
+
+# Serve a cached feed without touching the network if it was fetched this recently
+FEED_CACHE_TTL = float(os.environ.get("NEWS_FEED_CACHE_TTL", "1800"))
+# Keep at most this many feeds; least recently used ones are evicted first
+FEED_CACHE_MAX_ENTRIES = int(os.environ.get("NEWS_FEED_CACHE_MAX_ENTRIES", "500"))
+
+class FeedCache:
+    def __init__(self, ttl=FEED_CACHE_TTL, max_entries=FEED_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.conn = storage.connect("feeds")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS feeds (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                entries TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        row = self.conn.execute("SELECT * FROM feeds WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "etag": row["etag"],
+            "last_modified": row["last_modified"],
+            "entries": json.loads(row["entries"]),
+            "fetched_at": row["fetched_at"],
+        }
+
+    def is_fresh(self, cached):
+        return cached is not None and time.time() - cached["fetched_at"] < self.ttl
+
+    def store(self, url, entries, etag=None, last_modified=None):
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO feeds (url, etag, last_modified, entries, fetched_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, json.dumps(entries), now, now),
+        )
+
+    def touch(self, url, revalidated=False):
+        now = time.time()
+        if revalidated:
+            # A 304 means our copy is current again
+            self.conn.execute("UPDATE feeds SET fetched_at = ?, used_at = ? WHERE url = ?", (now, now, url))
+        else:
+            self.conn.execute("UPDATE feeds SET used_at = ? WHERE url = ?", (now, url))
+
+    def close(self):
+        self.conn.execute(
+            "DELETE FROM feeds WHERE url NOT IN (SELECT url FROM feeds ORDER BY used_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self.conn.commit()
+        self.conn.close()
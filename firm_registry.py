@@ -0,0 +1,235 @@
+import os
+import shutil
+import json
+import time
+import re
+import argparse
+import storage
+from textmatch import normalize_text, trigrams, similarity
+
+# Persistent registry of Delaware design/construction firms, shared by all three
+# scouts, with an alias index so "BSA+A", "Buck Simpers" and "Buck Simpers
+# Architect + Associates" resolve to one firm, and links from leads and news
+# items to those firms.
+
+# Trigram similarity needed for a fuzzy (non-alias) firm match
+FIRM_NAME_MATCH = float(os.environ.get("FIRM_NAME_MATCH", "0.7"))
+
+# Canonical name -> known abbreviations and short forms
+SEED_ALIASES = {
+    "Buck Simpers Architect + Associates": ["BSA+A", "BSAA", "Buck Simpers"],
+    "ABHA Architects": ["ABHA"],
+    "Becker Morgan Group": ["Becker Morgan", "BMG"],
+    "Tevebaugh Associates": ["Tevebaugh"],
+    "StudioJAED": ["Studio JAED", "JAED"],
+}
+
+# Corporate suffixes dropped before names are compared
+CORPORATE_SUFFIXES = {"inc", "llc", "llp", "pc", "pa", "ltd", "co", "corp", "corporation", "company", "the"}
+FIRM_ABBREVIATIONS = {"assoc": "associates", "assocs": "associates", "grp": "group", "arch": "architects", "archs": "architects"}
+PLACEHOLDER_FIRMS = {"", "tbd", "n a", "na", "unknown", "none", "not disclosed", "not specified"}
+# Stand-ins the lead prompt asks for when no firm is known ("Design RFP pending",
+# "Seeking architect - Design RFP stage", "Pre-bid phase - TBD"); same idea as
+# spectrum_scout._missing_designer
+PLACEHOLDER_PATTERN = re.compile(r"\b(tbd|tba|pending|seeking|rfp|unknown|not (yet )?(selected|named|announced|disclosed|specified))\b")
+
+# Stage groups a query can ask for; stored stages are matched on any of the terms.
+# Every stage the lead prompt allows (Planning Approval, Design Phase, Permits
+# Pending, Pre-Construction, Design RFP) counts as pre-bid.
+STAGE_GROUPS = {
+    "pre bid": ["planning", "approval", "design", "permit", "pre construction", "rfp", "proposed", "zoning", "concept"],
+    "design": ["design", "rfp", "concept"],
+    "permitting": ["permit", "approval", "zoning", "planning"],
+}
+
+def firm_key(name):
+    words = [FIRM_ABBREVIATIONS.get(word, word) for word in normalize_text(name).split() if word not in CORPORATE_SUFFIXES]
+    key = " ".join(words)
+    return "" if key in PLACEHOLDER_FIRMS or PLACEHOLDER_PATTERN.search(key) else key
+
+def split_firms(value):
+    # "Becker Morgan Group / Tevebaugh Associates" names two firms; "and"/"&" are left alone
+    # because they are usually part of one firm's name
+    return [part.strip() for part in re.split(r"[/;]| with ", str(value or "")) if firm_key(part)]
+
+class FirmRegistry:
+    def __init__(self):
+        # Registries from before it moved to the shared directory are carried over once
+        legacy = os.path.join(storage.CACHE_DIR, "firms.db")
+        if not os.path.exists(os.path.join(storage.SHARED_DIR, "firms.db")) and os.path.exists(legacy):
+            os.makedirs(storage.SHARED_DIR, exist_ok=True)
+            shutil.copy(legacy, os.path.join(storage.SHARED_DIR, "firms.db"))
+        self.conn = storage.connect("firms", directory=storage.SHARED_DIR)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS firms (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                data TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS firm_aliases (
+                alias TEXT PRIMARY KEY,
+                firm_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS firm_links (
+                firm_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                role TEXT NOT NULL,
+                ref TEXT NOT NULL,
+                name TEXT,
+                stage TEXT,
+                data TEXT NOT NULL,
+                linked_at REAL NOT NULL,
+                PRIMARY KEY (kind, ref, role, firm_id)
+            );
+            CREATE INDEX IF NOT EXISTS firm_links_firm ON firm_links (firm_id, stage);
+        """)
+        self._purge_placeholders()
+        self._load_matcher()
+        for canonical, aliases in SEED_ALIASES.items():
+            firm_id = self.aliases.get(firm_key(canonical)) or self._insert({"name": canonical}, time.time())
+            self._add_aliases(firm_id, aliases)
+        self.conn.commit()
+
+    def _purge_placeholders(self):
+        # Older runs registered lead placeholders ("Design RFP pending") as firms
+        ids = [(row["id"],) for row in self.conn.execute("SELECT id, name FROM firms") if not firm_key(row["name"])]
+        if ids:
+            self.conn.executemany("DELETE FROM firm_links WHERE firm_id = ?", ids)
+            self.conn.executemany("DELETE FROM firm_aliases WHERE firm_id = ?", ids)
+            self.conn.executemany("DELETE FROM firms WHERE id = ?", ids)
+            self.conn.commit()
+            print(f"🧹 Removed {len(ids)} placeholder firm(s) from the registry")
+
+    def _load_matcher(self):
+        # Every alias and its trigrams, held in memory so bulk linking never hits SQLite per name
+        self.aliases = {row["alias"]: row["firm_id"] for row in self.conn.execute("SELECT alias, firm_id FROM firm_aliases")}
+        self.alias_trigrams = {}
+        for alias in self.aliases:
+            for gram in trigrams(alias):
+                self.alias_trigrams.setdefault(gram, set()).add(alias)
+
+    def _add_aliases(self, firm_id, names):
+        for name in names:
+            key = firm_key(name)
+            if key:
+                self.conn.execute("INSERT OR IGNORE INTO firm_aliases (alias, firm_id) VALUES (?, ?)", (key, firm_id))
+                if key not in self.aliases:
+                    self.aliases[key] = firm_id
+                    for gram in trigrams(key):
+                        self.alias_trigrams.setdefault(gram, set()).add(key)
+
+    def _insert(self, firm, now):
+        cursor = self.conn.execute(
+            "INSERT INTO firms (name, data, first_seen, last_seen) VALUES (?, ?, ?, ?)",
+            (firm["name"], json.dumps(firm), now, now),
+        )
+        self._add_aliases(cursor.lastrowid, [firm["name"]])
+        return cursor.lastrowid
+
+    def resolve(self, name):
+        # Firm id for a name: exact alias first, then the closest alias by trigram similarity
+        key = firm_key(name)
+        if not key:
+            return None
+        if key in self.aliases:
+            return self.aliases[key]
+        grams = trigrams(key)
+        candidates = set().union(*(self.alias_trigrams.get(gram, ()) for gram in grams)) if grams else set()
+        best = max(candidates, key=lambda alias: similarity(grams, alias), default=None)
+        if best is not None and similarity(grams, best) >= FIRM_NAME_MATCH:
+            return self.aliases[best]
+        return None
+
+    def merge(self, firms):
+        # Adds new firms and fills in details on known ones; nothing is ever dropped
+        now = time.time()
+        counts = {"new": 0, "updated": 0}
+        for firm in firms:
+            if not firm_key(firm.get("name")):
+                continue
+            firm_id = self.resolve(firm["name"])
+            if firm_id is None:
+                self._insert(firm, now)
+                counts["new"] += 1
+                continue
+            row = self.conn.execute("SELECT data FROM firms WHERE id = ?", (firm_id,)).fetchone()
+            data = json.loads(row["data"])
+            data.update({field: value for field, value in firm.items() if value and field != "name"})
+            self.conn.execute("UPDATE firms SET data = ?, last_seen = ? WHERE id = ?", (json.dumps(data), now, firm_id))
+            self._add_aliases(firm_id, [firm["name"]])
+            counts["updated"] += 1
+        self.conn.commit()
+        total = self.conn.execute("SELECT COUNT(*) FROM firms").fetchone()[0]
+        print(f"🏢 Firm registry: {counts['new']} new, {counts['updated']} updated, {total} firms total")
+        return counts
+
+    def link(self, kind, items, roles, ref_field, stage_field, name_field, register=()):
+        # Links each item to the firms named in its `roles` fields; firms named in a
+        # `register` role are added to the registry when unknown (e.g. lead designers)
+        now = time.time()
+        links = []
+        for item in items:
+            ref = item.get(ref_field) or normalize_text(item.get(name_field))
+            if not ref:
+                continue
+            for role in roles:
+                for firm_name in split_firms(item.get(role)):
+                    firm_id = self.resolve(firm_name)
+                    if firm_id is None and role in register:
+                        firm_id = self._insert({"name": firm_name, "source": kind}, now)
+                    if firm_id is not None:
+                        links.append((
+                            firm_id, kind, role, ref, item.get(name_field),
+                            normalize_text(item.get(stage_field)), json.dumps(item), now,
+                        ))
+        self.conn.executemany("INSERT OR REPLACE INTO firm_links VALUES (?, ?, ?, ?, ?, ?, ?, ?)", links)
+        self.conn.commit()
+        print(f"🔗 Linked {len(links)} {kind} firm mention(s) to the firm registry")
+        return len(links)
+
+    def link_leads(self, leads):
+        return self.link("lead", leads, ["designer"], "source_url", "project_stage", "name", register=["designer"])
+
+    def link_news(self, items):
+        return self.link("news", items, ["developer", "contractor"], "source_url", "project_phase", "title")
+
+    def projects(self, firm_name, stage=None, kind=None):
+        # Linked leads/news for a firm, optionally narrowed to a stage ("pre-bid") or kind
+        firm_id = self.resolve(firm_name)
+        if firm_id is None:
+            return []
+        query, params = "SELECT * FROM firm_links WHERE firm_id = ?", [firm_id]
+        if stage:
+            terms = STAGE_GROUPS.get(normalize_text(stage), [normalize_text(stage)])
+            query += " AND (" + " OR ".join("stage LIKE ?" for _ in terms) + ")"
+            params += [f"%{term}%" for term in terms]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        return [dict(row, data=json.loads(row["data"])) for row in self.conn.execute(query + " ORDER BY linked_at DESC", params)]
+
+    def firms(self):
+        return [dict(json.loads(row["data"]), name=row["name"]) for row in self.conn.execute("SELECT name, data FROM firms ORDER BY name")]
+
+    def close(self):
+        self.conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the firm registry")
+    parser.add_argument("--firm", help="firm name or alias, e.g. 'Becker Morgan'")
+    parser.add_argument("--stage", help="only projects whose stage contains this, e.g. 'pre-bid'")
+    parser.add_argument("--kind", choices=["lead", "news"])
+    args = parser.parse_args()
+
+    registry = FirmRegistry()
+    try:
+        if args.firm:
+            for link in registry.projects(args.firm, stage=args.stage, kind=args.kind):
+                print(f"[{link['kind']}:{link['role']}] {link['name']} ({link['stage'] or 'unknown stage'})")
+        else:
+            for firm in registry.firms():
+                print(f"{firm['name']}  {firm.get('city', '')}  {firm.get('website', '')}")
+    finally:
+        registry.close()
@@ -1,9 +1,13 @@
-import os, json, requests, re, time
-from xai_sdk import Client
-from xai_sdk.chat import user
-from xai_sdk.tools import web_search
+import os, argparse
+import clients
+from json_stream import JSONObjectStream, iter_json_objects, xai_chunks
+import response_cache
+from response_cache import cache_key, cached_chunks
+import uploader
+from firm_registry import FirmRegistry
+import pipeline
+from pipeline import Pipeline
 
-client = Client(api_key=os.environ.get("XAI_API_KEY"))
 WEBHOOK_URL = os.environ.get("SUPABASE_WEBHOOK_URL")
 SUPABASE_ANON_KEY = os.environ.get("SUPABASE_ANON_KEY")
 
@@ -17,43 +21,68 @@ def get_top_firms():
         "Return ONLY a JSON array of objects: [{\"name\": \"...\", \"address\": \"...\", \"city\": \"...\", \"state\": \"DE\", \"website\": \"...\"}]"
     )
 
+    firms = []
     try:
-        # We enable web_search to get current 2026 data
-        chat = client.chat.create(
-            model="grok-4-1-fast", 
-            tools=[web_search()],
-            max_tokens=1500 # Increased slightly to handle 20 detailed objects
-        )
-        chat.append(user(prompt))
+        def response_chunks():
+            # We enable web_search to get current 2026 data
+            chat = clients.xai_chat(
+                "grok-4-1-fast",
+                user_prompt=prompt,
+                max_tokens=1500 # Increased slightly to handle 20 detailed objects
+            )
+            yield from xai_chunks(chat)
         
-        response = chat.sample()
-        raw_content = response.content.strip()
+        # Stream the response (or replay a cached one) and keep each firm as soon as its JSON object closes
+        # A list cut off by max_tokens or with no JSON at all is not cached
+        stream = JSONObjectStream()
+        key = cache_key(model="grok-4-1-fast", messages=[prompt], tools=["web_search"], max_tokens=1500)
+        chunks = cached_chunks("firms", key, response_chunks, store_if=lambda: not stream.incomplete and bool(firms))
+        for firm in iter_json_objects(chunks, stream):
+            print(f"  ⭐ Found: {firm.get('name')}")
+            firms.append(firm)
 
-        # Extract JSON from response
-        json_match = re.search(r'\[\s*\{.*\}\s*\]', raw_content, re.DOTALL)
-        if json_match:
-            firms = json.loads(re.sub(r',(\s*[}\]])', r'\1', json_match.group(0)))
-            for f in firms:
-                print(f"  ⭐ Found: {f.get('name')}")
-            return firms
-        else:
+        if not firms:
             print("⚠️ Could not find JSON in response.")
-            return []
+        return firms
 
     except Exception as e:
         print(f"⚠️ Search Error: {e}")
-        return []
+        # Anything that streamed in before the error is still usable
+        return firms
 
 def send_to_supabase(firms):
-    if not firms: return
+    headers = {"Authorization": f"Bearer {SUPABASE_ANON_KEY}"}
+    if not firms:
+        uploader.replay_spool(WEBHOOK_URL, "firms", headers)
+        return False
     print(f"📤 Uploading {len(firms)} premium firms to Supabase...")
-    headers = {"Content-Type": "application/json", "Authorization": f"Bearer {SUPABASE_ANON_KEY}"}
-    try:
-        r = requests.post(WEBHOOK_URL, headers=headers, json={"firms": firms}, timeout=30)
-        print("✅ Supabase Updated!" if r.status_code == 200 else f"✗ Error: {r.text}")
-    except Exception as e:
-        print(f"❌ Connection Error: {e}")
+    delivered = uploader.upload_delta(WEBHOOK_URL, "firms", firms, headers)
+    print("✅ Supabase Updated!" if delivered else "✗ Error: upload failed; failed batches will be retried next run")
+    return delivered
 
 if __name__ == "__main__":
-    top_firms = get_top_firms()
-    send_to_supabase(top_firms)
+    parser = argparse.ArgumentParser(description="Scrape the top Delaware architecture/design firms")
+    response_cache.add_arguments(parser)
+    uploader.add_arguments(parser)
+    pipeline.add_arguments(parser)
+    args = parser.parse_args()
+    response_cache.configure(args)
+    uploader.configure(args)
+    
+    run = Pipeline("firms", profile=args.profile)
+    try:
+        with run.stage("search") as stage:
+            top_firms = get_top_firms()
+            stage.items_out = len(top_firms)
+        # Each run's firms are merged into the registry rather than replacing it
+        registry = FirmRegistry()
+        try:
+            with run.stage("registry", items_in=len(top_firms)) as stage:
+                counts = registry.merge(top_firms)
+                stage.items_out = counts["new"] + counts["updated"]
+        finally:
+            registry.close()
+        with run.stage("upload", items_in=len(top_firms)) as stage:
+            stage.items_out = len(top_firms) if send_to_supabase(top_firms) else 0
+    finally:
+        run.finish()
@@ -0,0 +1,184 @@
+import os
+import math
+import argparse
+
+# Delaware geography for lead coordinates: bounding box, simplified county
+# polygons and town centroids (bundled, accurate to a mile or two - enough to
+# catch a model putting a Dover project in Sussex), plus the grid cells that
+# LeadStore indexes for radius and per-county queries.
+
+DE_BOUNDS = {"min_lat": 38.45, "max_lat": 39.84, "min_lon": -75.79, "max_lon": -75.04}
+
+# (longitude, latitude) rings
+_COAST = [
+    (-75.415, 39.801), (-75.500, 39.730), (-75.560, 39.660), (-75.590, 39.570), (-75.570, 39.500),
+    (-75.490, 39.370), (-75.470, 39.330), (-75.400, 39.060), (-75.310, 38.940), (-75.230, 38.840),
+    (-75.090, 38.800), (-75.070, 38.720), (-75.050, 38.540), (-75.049, 38.451),
+]
+_NORTH_ARC = [
+    (-75.788, 39.722), (-75.745, 39.775), (-75.700, 39.805), (-75.640, 39.830), (-75.594, 39.839),
+    (-75.530, 39.835), (-75.470, 39.826), (-75.415, 39.801),
+]
+_NEW_CASTLE_KENT = [(-75.761, 39.297), (-75.600, 39.310), (-75.550, 39.330), (-75.490, 39.370)]
+_KENT_SUSSEX = [(-75.731, 38.830), (-75.550, 38.860), (-75.430, 38.910), (-75.310, 38.940)]
+
+COUNTY_POLYGONS = {
+    "New Castle": _NORTH_ARC + _COAST[1:6] + _NEW_CASTLE_KENT[::-1][1:],
+    "Kent": _NEW_CASTLE_KENT + _COAST[6:9] + _KENT_SUSSEX[::-1][1:],
+    "Sussex": _KENT_SUSSEX + _COAST[9:] + [(-75.707, 38.460)],
+}
+
+TOWN_CENTROIDS = {
+    "wilmington": (39.7447, -75.5484), "newark": (39.6837, -75.7497), "new castle": (39.6620, -75.5663),
+    "bear": (39.6293, -75.6583), "glasgow": (39.6048, -75.7452), "hockessin": (39.7876, -75.6966),
+    "claymont": (39.8004, -75.4596), "pike creek": (39.7309, -75.6980), "elsmere": (39.7393, -75.5980),
+    "newport": (39.7137, -75.6093), "delaware city": (39.5779, -75.5888), "middletown": (39.4496, -75.7163),
+    "townsend": (39.3951, -75.6916), "smyrna": (39.2998, -75.6047), "clayton": (39.2907, -75.6344),
+    "cheswold": (39.2190, -75.5852), "dover": (39.1582, -75.5244), "camden": (39.1134, -75.5416),
+    "wyoming": (39.1184, -75.5588), "magnolia": (39.0707, -75.4766), "felton": (39.0084, -75.5780),
+    "frederica": (39.0090, -75.4655), "harrington": (38.9237, -75.5777), "milford": (38.9126, -75.4280),
+    "greenwood": (38.8071, -75.5913), "milton": (38.7776, -75.3099), "lewes": (38.7746, -75.1393),
+    "bridgeville": (38.7426, -75.6044), "rehoboth beach": (38.7209, -75.0760), "dewey beach": (38.6926, -75.0746),
+    "georgetown": (38.6901, -75.3855), "seaford": (38.6412, -75.6113), "blades": (38.6357, -75.6091),
+    "long neck": (38.6176, -75.1488), "millsboro": (38.5915, -75.2913), "laurel": (38.5565, -75.5713),
+    "millville": (38.5488, -75.1216), "ocean view": (38.5451, -75.0890), "bethany beach": (38.5396, -75.0552),
+    "fenwick island": (38.4623, -75.0513), "selbyville": (38.4604, -75.2207), "delmar": (38.4565, -75.5774),
+}
+
+# How far a point may sit outside a polygon / from its town before it is flagged
+BOUNDARY_TOLERANCE_MILES = float(os.environ.get("GEO_BOUNDARY_TOLERANCE_MILES", "1.5"))
+TOWN_MISMATCH_MILES = float(os.environ.get("GEO_TOWN_MISMATCH_MILES", "8"))
+
+def coordinate(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+def lead_position(lead):
+    latitude, longitude = coordinate(lead.get("latitude")), coordinate(lead.get("longitude"))
+    if latitude is None or longitude is None:
+        return None
+    return latitude, longitude
+
+def distance_miles(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 3958.8 * 2 * math.asin(math.sqrt(a))
+
+def in_bounds(latitude, longitude):
+    return (DE_BOUNDS["min_lat"] <= latitude <= DE_BOUNDS["max_lat"]
+            and DE_BOUNDS["min_lon"] <= longitude <= DE_BOUNDS["max_lon"])
+
+def _in_polygon(latitude, longitude, ring):
+    inside = False
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > latitude) != (y2 > latitude):
+            if longitude < x1 + (latitude - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+def _miles_to_polygon(latitude, longitude, ring):
+    # Distance to the nearest edge, on a local flat projection (fine at county scale)
+    scale_x = 69.17 * math.cos(math.radians(latitude))
+    px, py = longitude * scale_x, latitude * 69.0
+    best = float("inf")
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        ax, ay, bx, by = x1 * scale_x, y1 * 69.0, x2 * scale_x, y2 * 69.0
+        dx, dy = bx - ax, by - ay
+        t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy or 1)))
+        best = min(best, math.hypot(px - (ax + t * dx), py - (ay + t * dy)))
+    return best
+
+def county_at(latitude, longitude):
+    # County containing the point, or the nearest one within tolerance, else None
+    nearest, nearest_miles = None, float("inf")
+    for county, ring in COUNTY_POLYGONS.items():
+        if _in_polygon(latitude, longitude, ring):
+            return county
+        miles = _miles_to_polygon(latitude, longitude, ring)
+        if miles < nearest_miles:
+            nearest, nearest_miles = county, miles
+    return nearest if nearest_miles <= BOUNDARY_TOLERANCE_MILES else None
+
+def normalize_county(county):
+    county = str(county or "").lower().replace("county", "").strip()
+    return next((name for name in COUNTY_POLYGONS if name.lower() == county), None)
+
+def town_position(city):
+    return TOWN_CENTROIDS.get(str(city or "").lower().replace(", de", "").replace(", delaware", "").strip())
+
+def location_flags(lead):
+    # Reasons a lead's coordinates disagree with Delaware or its stated county/city
+    position = lead_position(lead)
+    if position is None:
+        return ["missing coordinates"]
+    latitude, longitude = position
+    if not in_bounds(latitude, longitude):
+        return [f"coordinates ({latitude:.4f}, {longitude:.4f}) are outside Delaware's bounding box"]
+    geo_county = county_at(latitude, longitude)
+    if geo_county is None:
+        return [f"coordinates ({latitude:.4f}, {longitude:.4f}) are outside Delaware"]
+
+    flags = []
+    stated_county = normalize_county(lead.get("county"))
+    if stated_county and stated_county != geo_county:
+        # Points just across a county line are given the benefit of the doubt
+        if _miles_to_polygon(latitude, longitude, COUNTY_POLYGONS[stated_county]) > BOUNDARY_TOLERANCE_MILES:
+            flags.append(f"coordinates are in {geo_county} County, not {stated_county}")
+    town = town_position(lead.get("city"))
+    if town:
+        miles = distance_miles(latitude, longitude, *town)
+        if miles > TOWN_MISMATCH_MILES:
+            flags.append(f"coordinates are {miles:.0f} mi from {lead.get('city')}")
+    return flags
+
+# Grid cells for the spatial index on stored leads (about 3.5 x 2.7 miles in Delaware)
+CELL_DEGREES = 0.05
+
+def grid_cell(latitude, longitude):
+    return f"{math.floor(latitude / CELL_DEGREES)}:{math.floor(longitude / CELL_DEGREES)}"
+
+def cells_within(latitude, longitude, miles):
+    # Every grid cell that can hold a point within `miles` of the given one
+    lat_cells = math.ceil(miles / 69.0 / CELL_DEGREES)
+    lon_cells = math.ceil(miles / (69.17 * max(math.cos(math.radians(latitude)), 0.01)) / CELL_DEGREES)
+    row, col = math.floor(latitude / CELL_DEGREES), math.floor(longitude / CELL_DEGREES)
+    return [f"{r}:{c}" for r in range(row - lat_cells, row + lat_cells + 1) for c in range(col - lon_cells, col + lon_cells + 1)]
+
+def place_position(place):
+    # `place` is a Delaware town name or a (latitude, longitude) pair
+    position = town_position(place) if isinstance(place, str) else place
+    if position is None:
+        raise ValueError(f"Unknown Delaware town: {place}")
+    return position
+
+def lead_geo(lead):
+    # (grid cell, county) stored with a lead; the cell is None unless the
+    # coordinates are inside Delaware, and the county falls back to the stated one
+    position = lead_position(lead)
+    county = county_at(*position) if position and in_bounds(*position) else None
+    cell = grid_cell(*position) if county else None
+    return cell, county or normalize_county(lead.get("county"))
+
+if __name__ == "__main__":
+    from lead_store import LeadStore
+
+    parser = argparse.ArgumentParser(description="Query stored leads by location")
+    parser.add_argument("--near", help="Delaware town, or 'lat,lon'")
+    parser.add_argument("--miles", type=float, default=10)
+    parser.add_argument("--counts", action="store_true", help="show per-county lead counts")
+    args = parser.parse_args()
+
+    store = LeadStore()
+    try:
+        if args.counts or not args.near:
+            for county, count in sorted(store.county_counts().items()):
+                print(f"{county:<12} {count}")
+        if args.near:
+            place = tuple(map(float, args.near.split(","))) if "," in args.near else args.near
+            for distance, _, lead in store.near(place, args.miles):
+                print(f"{distance:5.1f} mi  {lead.get('name')} ({lead.get('city')}, {lead.get('project_stage')})")
+    finally:
+        store.close()
@@ -0,0 +1,116 @@
+import re
+import json
+import pipeline
+
+# Model output is usually a JSON array of objects, sometimes wrapped in ```json
+# fences or prose. Rather than waiting for the whole completion we scan the
+# text as it streams and hand back each top-level {...} as soon as it closes,
+# so a truncated response still keeps every complete object.
+
+_SPECIAL_CHARS = re.compile(r'[{}"\\]')
+_STRING_CHARS = re.compile(r'["\\]')
+# Remove trailing commas before closing braces/brackets
+_TRAILING_COMMA = re.compile(r',(\s*[}\]])')
+
+class JSONObjectStream:
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.errors = 0
+
+    @property
+    def incomplete(self):
+        # True if the text ended in the middle of an object
+        return self._depth > 0
+
+    def feed(self, text):
+        objects = []
+        pos = 0
+        segment_start = 0
+        while pos < len(text):
+            if self._depth == 0:
+                # Outside any object: skip fences, brackets, commas and prose
+                start = text.find("{", pos)
+                if start == -1:
+                    break
+                self._parts = []
+                self._depth = 1
+                segment_start = start
+                pos = start + 1
+                continue
+
+            if self._escape:
+                # The previous chunk ended on a backslash inside a string
+                self._escape = False
+                pos += 1
+                continue
+
+            match = (_STRING_CHARS if self._in_string else _SPECIAL_CHARS).search(text, pos)
+            if match is None:
+                break
+            char = match.group()
+            pos = match.end()
+
+            if char == "\\":
+                if pos < len(text):
+                    pos += 1
+                else:
+                    self._escape = True
+            elif char == '"':
+                self._in_string = not self._in_string
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(text[segment_start:pos])
+                    obj = self._decode("".join(self._parts))
+                    if obj is not None:
+                        objects.append(obj)
+                    self._parts = []
+
+        if self._depth > 0:
+            self._parts.append(text[segment_start:])
+        return objects
+
+    def _decode(self, raw):
+        try:
+            obj = json.loads(_TRAILING_COMMA.sub(r"\1", raw))
+        except json.JSONDecodeError:
+            self.errors += 1
+            return None
+        return obj if isinstance(obj, dict) else None
+
+def iter_json_objects(chunks, stream=None):
+    stream = stream if stream is not None else JSONObjectStream()
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+
+def parse_json_objects(text):
+    return list(iter_json_objects([text]))
+
+def _record_usage(usage):
+    if usage is not None:
+        pipeline.record(
+            prompt_tokens=getattr(usage, "prompt_tokens", 0),
+            completion_tokens=getattr(usage, "completion_tokens", 0),
+        )
+
+def xai_chunks(chat):
+    # Text deltas from an xai_sdk chat
+    response = None
+    for response, chunk in chat.stream():
+        if chunk.content:
+            pipeline.record(bytes=len(chunk.content.encode("utf-8")))
+            yield chunk.content
+    _record_usage(getattr(response, "usage", None))
+
+def openai_chunks(completion_stream):
+    # Text deltas from an OpenAI-compatible chat.completions stream
+    for chunk in completion_stream:
+        _record_usage(getattr(chunk, "usage", None))
+        if chunk.choices and chunk.choices[0].delta.content:
+            pipeline.record(bytes=len(chunk.choices[0].delta.content.encode("utf-8")))
+            yield chunk.choices[0].delta.content
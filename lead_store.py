@@ -0,0 +1,224 @@
+import os
+import json
+import math
+import time
+import hashlib
+import storage
+from textmatch import normalize_text, normalize_address, trigrams, similarity, numbers_conflict
+from geo import coordinate, distance_miles, lead_geo, cells_within, place_position
+
+# Name similarity needed to treat two leads as the same project on its own,
+# and the lower bar used when the leads are also within LEAD_MATCH_RADIUS_MILES
+LEAD_NAME_MATCH = float(os.environ.get("LEAD_NAME_MATCH", "0.6"))
+LEAD_NEARBY_NAME_MATCH = float(os.environ.get("LEAD_NEARBY_NAME_MATCH", "0.3"))
+LEAD_MATCH_RADIUS_MILES = float(os.environ.get("LEAD_MATCH_RADIUS_MILES", "0.25"))
+
+# Older SQLite builds allow 999 bound parameters per statement, so IN lists are sent in slices
+SQL_BATCH = 500
+
+# Fields whose change makes a known lead worth re-sending
+TRACKED_FIELDS = [
+    "address", "city", "county", "sector", "budget", "designer", "general_contractor",
+    "project_stage", "construction_status", "timeline", "deadline", "estimated_sqft",
+]
+
+def lead_hash(lead):
+    tracked = {field: lead.get(field) for field in TRACKED_FIELDS}
+    return hashlib.sha1(json.dumps(tracked, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class LeadStore:
+    def __init__(self):
+        self.conn = storage.connect("leads")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS leads (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                norm_address TEXT,
+                latitude REAL,
+                longitude REAL,
+                content_hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS leads_address ON leads (norm_address);
+            CREATE INDEX IF NOT EXISTS leads_position ON leads (latitude, longitude);
+            CREATE TABLE IF NOT EXISTS lead_trigrams (
+                trigram TEXT NOT NULL,
+                lead_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lead_trigrams_trigram ON lead_trigrams (trigram);
+        """)
+        self._add_geo_columns()
+
+    def _add_geo_columns(self):
+        # Grid cell and county (see geo.lead_geo) are kept per lead for indexed location queries;
+        # stores created before they existed are migrated and backfilled once
+        columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(leads)")}
+        if "geo_cell" not in columns:
+            self.conn.execute("ALTER TABLE leads ADD COLUMN geo_cell TEXT")
+            self.conn.execute("ALTER TABLE leads ADD COLUMN county TEXT")
+            self.conn.executemany(
+                "UPDATE leads SET geo_cell = ?, county = ? WHERE id = ?",
+                [(*lead_geo(json.loads(row["data"])), row["id"]) for row in self.conn.execute("SELECT id, data FROM leads")],
+            )
+        # Covering index: radius candidates are filtered without touching the rows
+        self.conn.execute("CREATE INDEX IF NOT EXISTS leads_geo_cell ON leads (geo_cell, latitude, longitude)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS leads_county ON leads (county)")
+        self.conn.commit()
+
+    def _name_candidates(self, grams, limit=25):
+        if not grams:
+            return []
+        placeholders = ",".join("?" * len(grams))
+        # Leads sharing the most trigrams with the name; similarity is checked afterwards
+        rows = self.conn.execute(
+            f"SELECT lead_id, COUNT(*) AS shared FROM lead_trigrams WHERE trigram IN ({placeholders}) "
+            f"GROUP BY lead_id ORDER BY shared DESC LIMIT ?",
+            (*grams, limit),
+        ).fetchall()
+        return [row["lead_id"] for row in rows]
+
+    def _nearby(self, latitude, longitude):
+        # Bounding box on the (latitude, longitude) index, then exact distance
+        lat_delta = LEAD_MATCH_RADIUS_MILES / 69.0
+        lon_delta = LEAD_MATCH_RADIUS_MILES / (69.0 * max(math.cos(math.radians(latitude)), 0.01))
+        rows = self.conn.execute(
+            "SELECT id, latitude, longitude FROM leads WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+            (latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta),
+        ).fetchall()
+        return [
+            row["id"] for row in rows
+            if distance_miles(latitude, longitude, row["latitude"], row["longitude"]) <= LEAD_MATCH_RADIUS_MILES
+        ]
+
+    def find_match(self, lead):
+        # Returns the stored row for the same project, or None
+        address = normalize_address(lead.get("address"))
+        if address:
+            row = self.conn.execute("SELECT * FROM leads WHERE norm_address = ?", (address,)).fetchone()
+            if row is not None:
+                return row
+
+        name = lead.get("name")
+        grams = trigrams(name)
+        scores = {}
+        
+        def score(row):
+            return 0.0 if numbers_conflict(name, row["name"]) else similarity(grams, row["name"])
+        
+        for lead_id in self._name_candidates(grams):
+            row = self.conn.execute("SELECT * FROM leads WHERE id = ?", (lead_id,)).fetchone()
+            scores[lead_id] = (score(row), row)
+
+        best = max(scores.values(), key=lambda item: item[0], default=(0.0, None))
+        if best[0] >= LEAD_NAME_MATCH:
+            return best[1]
+
+        latitude, longitude = coordinate(lead.get("latitude")), coordinate(lead.get("longitude"))
+        if latitude is not None and longitude is not None:
+            for lead_id in self._nearby(latitude, longitude):
+                if lead_id not in scores:
+                    row = self.conn.execute("SELECT * FROM leads WHERE id = ?", (lead_id,)).fetchone()
+                    scores[lead_id] = (score(row), row)
+                if scores[lead_id][0] >= LEAD_NEARBY_NAME_MATCH:
+                    return scores[lead_id][1]
+        return None
+
+    def _index_name(self, lead_id, name):
+        self.conn.execute("DELETE FROM lead_trigrams WHERE lead_id = ?", (lead_id,))
+        self.conn.executemany(
+            "INSERT INTO lead_trigrams (trigram, lead_id) VALUES (?, ?)",
+            [(gram, lead_id) for gram in trigrams(name)],
+        )
+
+    def upsert(self, lead):
+        # Returns "new", "updated" or "unchanged"; nothing is saved until commit()
+        now = time.time()
+        content_hash = lead_hash(lead)
+        values = (
+            lead.get("name"), normalize_address(lead.get("address")) or None,
+            coordinate(lead.get("latitude")), coordinate(lead.get("longitude")),
+            content_hash, json.dumps(lead), *lead_geo(lead), now,
+        )
+        row = self.find_match(lead)
+        if row is None:
+            cursor = self.conn.execute(
+                "INSERT INTO leads (name, norm_address, latitude, longitude, content_hash, data, geo_cell, county, last_seen, first_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*values, now),
+            )
+            self._index_name(cursor.lastrowid, lead.get("name"))
+            return "new"
+        if row["content_hash"] == content_hash:
+            self.conn.execute("UPDATE leads SET last_seen = ? WHERE id = ?", (now, row["id"]))
+            return "unchanged"
+        self.conn.execute(
+            "UPDATE leads SET name = ?, norm_address = ?, latitude = ?, longitude = ?, content_hash = ?, data = ?, "
+            "geo_cell = ?, county = ?, last_seen = ? "
+            "WHERE id = ?",
+            (*values, row["id"]),
+        )
+        if normalize_text(row["name"]) != normalize_text(lead.get("name")):
+            self._index_name(row["id"], lead.get("name"))
+        return "updated"
+
+    def classify(self, leads):
+        # Upserts every lead and returns only the new or changed ones
+        changed = []
+        counts = {"new": 0, "updated": 0, "unchanged": 0}
+        for lead in leads:
+            status = self.upsert(lead)
+            counts[status] += 1
+            if status != "unchanged":
+                changed.append(lead)
+        print(f"🗂️  Lead history: {counts['new']} new, {counts['updated']} updated, {counts['unchanged']} unchanged")
+        return changed
+
+    def within(self, latitude, longitude, miles):
+        # [(distance_miles, lead_id, lead)] within `miles`, nearest first. Candidates come from
+        # the geo_cell index alone; lead data is only read for those inside the radius.
+        cells = cells_within(latitude, longitude, miles)
+        lat_delta = miles / 69.0
+        lon_delta = miles / (69.0 * max(math.cos(math.radians(latitude)), 0.01))
+        box = (latitude - lat_delta, latitude + lat_delta, longitude - lon_delta, longitude + lon_delta)
+        distances = {}
+        for start in range(0, len(cells), SQL_BATCH):
+            batch = cells[start:start + SQL_BATCH]
+            candidates = self.conn.execute(
+                f"SELECT id, latitude, longitude FROM leads WHERE geo_cell IN ({','.join('?' * len(batch))}) "
+                f"AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+                (*batch, *box),
+            )
+            for row in candidates:
+                distance = distance_miles(latitude, longitude, row["latitude"], row["longitude"])
+                if distance <= miles:
+                    distances[row["id"]] = distance
+        ids = list(distances)
+        found = []
+        for start in range(0, len(ids), SQL_BATCH):
+            batch = ids[start:start + SQL_BATCH]
+            for row in self.conn.execute(f"SELECT id, data FROM leads WHERE id IN ({','.join('?' * len(batch))})", batch):
+                found.append((distances[row["id"]], row["id"], json.loads(row["data"])))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def near(self, place, miles):
+        # `place` is a Delaware town name or a (latitude, longitude) pair
+        return self.within(*place_position(place), miles)
+
+    def county_counts(self):
+        # Leads per county (from coordinates, else as stated); answered from the county index
+        rows = self.conn.execute("SELECT county, COUNT(*) AS leads FROM leads GROUP BY county")
+        return {row["county"] or "Unknown": row["leads"] for row in rows}
+
+    def known_leads(self):
+        # Every stored lead, with its row id as "lead_id" (the identity used for uploads)
+        return [{**json.loads(row["data"]), "lead_id": row["id"]} for row in self.conn.execute("SELECT id, data FROM leads ORDER BY id")]
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        # Uncommitted upserts are rolled back
+        self.conn.close()
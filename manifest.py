@@ -0,0 +1,82 @@
+import json
+import time
+import hashlib
+import storage
+from textmatch import normalize_text
+
+# What was last delivered to each webhook channel, by record identity and
+# content hash, so uploads can carry only inserts, updates and tombstones.
+
+# Fields that identify a record across runs; the first non-empty one is the key,
+# and all of them are sent in tombstones. Leads use their LeadStore row id, so a
+# project the store matched under a new name is an update, not a new row.
+IDENTITY_FIELDS = {
+    "leads": ["lead_id", "name"],
+    "news": ["source_url", "title"],
+    "firms": ["name"],
+}
+
+def record_hash(record):
+    # Canonical JSON (sorted keys, no whitespace) so key order never changes the hash
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def identity(channel, record):
+    fields = IDENTITY_FIELDS.get(channel, ["id", "name"])
+    return {field: record.get(field) for field in fields if record.get(field)}
+
+def record_id(channel, record):
+    fields = IDENTITY_FIELDS.get(channel, ["id", "name"])
+    value = next((record.get(field) for field in fields if record.get(field)), None)
+    return hashlib.sha1(normalize_text(str(value)).encode("utf-8")).hexdigest() if value else None
+
+class Manifest:
+    def __init__(self, channel):
+        self.channel = channel
+        self.conn = storage.connect("manifest")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS delivered (
+                channel TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                identity TEXT NOT NULL,
+                delivered_at REAL NOT NULL,
+                PRIMARY KEY (channel, record_id)
+            )
+        """)
+
+    def diff(self, records, full=False, tombstones=False):
+        # Returns (upserts, deletes, unchanged): upserts are (record_id, hash, record),
+        # deletes are (record_id, identity) for delivered records missing from `records`
+        delivered = {
+            row["record_id"]: (row["content_hash"], row["identity"])
+            for row in self.conn.execute("SELECT record_id, content_hash, identity FROM delivered WHERE channel = ?", (self.channel,))
+        }
+        upserts, current, unchanged = [], set(), 0
+        for record in records:
+            rid = record_id(self.channel, record) or record_hash(record)
+            if rid in current:
+                continue
+            current.add(rid)
+            content_hash = record_hash(record)
+            if not full and delivered.get(rid, (None,))[0] == content_hash:
+                unchanged += 1
+                continue
+            upserts.append((rid, content_hash, record))
+        deletes = [(rid, json.loads(ident)) for rid, (_, ident) in delivered.items() if rid not in current] if tombstones else []
+        return upserts, deletes, unchanged
+
+    def mark_delivered(self, upserts):
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO delivered (channel, record_id, content_hash, identity, delivered_at) VALUES (?, ?, ?, ?, ?)",
+            [(self.channel, rid, content_hash, json.dumps(identity(self.channel, record)), now) for rid, content_hash, record in upserts],
+        )
+        self.conn.commit()
+
+    def mark_deleted(self, deletes):
+        self.conn.executemany("DELETE FROM delivered WHERE channel = ? AND record_id = ?", [(self.channel, rid) for rid, _ in deletes])
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
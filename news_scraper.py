@@ -1,19 +1,132 @@
 import os
 import json
-import requests
-import feedparser
-from openai import OpenAI
+import time
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import clients
+from feed_cache import FeedCache
+from article_fetcher import enrich_articles
+from firm_registry import FirmRegistry
+from seen_articles import SeenArticles, match_results
+from clustering import cluster_articles
+from relevance import RelevanceModel, prefilter
+from json_stream import JSONObjectStream, iter_json_objects, openai_chunks
+from rules import load_rules
+import response_cache
+from response_cache import cache_key, cached_chunks
+import uploader
+import pipeline
+from pipeline import Pipeline
 
-# 1. Setup Grok Client
-client = OpenAI(
-    api_key=os.environ.get("XAI_API_KEY"),
-    base_url="https://api.x.ai/v1",
-)
+# 1. Grok client (OpenAI-compatible endpoint) is created on first use by clients.openai_client()
 
 WEBHOOK_URL = os.environ.get("SUPABASE_WEBHOOK_URL")
 SUPABASE_ANON_KEY = os.environ.get("SUPABASE_ANON_KEY")
 
-def get_delaware_news():
+# Feed fetching: how many feeds are in flight at once and how long each may take
+FEED_CONCURRENCY = int(os.environ.get("NEWS_FEED_CONCURRENCY", "8"))
+FEED_TIMEOUT = float(os.environ.get("NEWS_FEED_TIMEOUT", "20"))
+FEED_USER_AGENT = "Mozilla/5.0 (compatible; DelawareScout/1.0)"
+
+# Grok analysis: headlines are split into chunks of roughly this many prompt
+# tokens and analyzed by a small worker pool, each chunk retried on its own.
+ANALYSIS_CHUNK_TOKENS = int(os.environ.get("NEWS_ANALYSIS_CHUNK_TOKENS", "2500"))
+ANALYSIS_WORKERS = int(os.environ.get("NEWS_ANALYSIS_WORKERS", "4"))
+ANALYSIS_RETRIES = int(os.environ.get("NEWS_ANALYSIS_RETRIES", "3"))
+ANALYSIS_TIMEOUT = float(os.environ.get("NEWS_ANALYSIS_TIMEOUT", "120"))
+
+# Download each new article's text before analysis so the model can fill in
+# size, value, developer and contractor (see article_fetcher.py)
+FETCH_ARTICLES = os.environ.get("NEWS_FETCH_ARTICLES", "0") == "1"
+
+NEWS_RULES = load_rules("news")
+
+def _entry_dict(entry):
+    return {
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "published": entry.get("published"),
+    }
+
+async def _fetch_feed(session, semaphore, rss_url, cached):
+    # Conditional GET: let Google answer 304 if the feed hasn't changed
+    headers = {}
+    if cached:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with semaphore:
+        # requests is blocking, so each download runs on a worker thread;
+        # the semaphore keeps at most FEED_CONCURRENCY sockets open.
+        response = await asyncio.wait_for(
+            asyncio.to_thread(session.get, rss_url, headers=headers, timeout=FEED_TIMEOUT),
+            timeout=FEED_TIMEOUT + 5,
+        )
+    pipeline.record(bytes=len(response.content))
+    if response.status_code == 304 and cached:
+        return {"status": "not_modified", "entries": cached["entries"]}
+    response.raise_for_status()
+    import feedparser  # imported on first download so cached runs skip it
+    feed = feedparser.parse(response.content)
+    return {
+        "status": "fetched",
+        "entries": [_entry_dict(entry) for entry in feed.entries],
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
+
+async def _fetch_all_feeds(rss_sources, cached_feeds):
+    import requests
+    semaphore = asyncio.Semaphore(FEED_CONCURRENCY)
+    with requests.Session() as session:
+        # One shared connection pool sized to the concurrency cap
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=FEED_CONCURRENCY)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers["User-Agent"] = FEED_USER_AGENT
+        # gather() keeps results in rss_sources order, so dedup below stays stable
+        return await asyncio.gather(
+            *(_fetch_feed(session, semaphore, rss_url, cached) for rss_url, cached in zip(rss_sources, cached_feeds)),
+            return_exceptions=True,
+        )
+
+def fetch_feeds(rss_sources, cache=None):
+    # Returns one list of entry dicts (or the exception) per feed, in order
+    cached_feeds = [cache.get(rss_url) if cache else None for rss_url in rss_sources]
+    results = [None] * len(rss_sources)
+    to_fetch = []
+    for i, cached in enumerate(cached_feeds):
+        if cache and cache.is_fresh(cached):
+            results[i] = cached["entries"]
+            cache.touch(rss_sources[i])
+        else:
+            to_fetch.append(i)
+
+    fetched = asyncio.run(_fetch_all_feeds(
+        [rss_sources[i] for i in to_fetch], [cached_feeds[i] for i in to_fetch]
+    )) if to_fetch else []
+
+    counts = {"fresh": len(rss_sources) - len(to_fetch), "not_modified": 0, "fetched": 0}
+    for i, result in zip(to_fetch, fetched):
+        if isinstance(result, BaseException):
+            # Fall back to a stale copy rather than losing the feed entirely
+            results[i] = cached_feeds[i]["entries"] if cached_feeds[i] else result
+            continue
+        counts[result["status"]] += 1
+        results[i] = result["entries"]
+        if cache and result["status"] == "fetched":
+            cache.store(rss_sources[i], result["entries"], result["etag"], result["last_modified"])
+        elif cache:
+            cache.touch(rss_sources[i], revalidated=True)
+
+    if cache:
+        print(f"Feed cache: {counts['fresh']} fresh, {counts['not_modified']} not modified, {counts['fetched']} downloaded")
+    return results
+
+def get_delaware_news(use_cache=True, sources=None):
     print("Step 1: Fetching statewide Delaware construction news (Lookback: 3 days)...")
     
     # IMPROVEMENT #2: Intent-based keywords for early-phase discovery
@@ -42,32 +155,63 @@ def get_delaware_news():
         # --- COASTAL/REGIONAL ---
         f"https://news.google.com/rss/search?q=%28Rehoboth+OR+Lewes+OR+Seaford%29+construction+{intent_query}+when:4d&hl=en-US&gl=US&ceid=US:en",
     ]
+    if sources is not None:
+        # Caller-supplied feeds (benchmarks, extra towns/sectors)
+        rss_sources = sources
     
     all_articles = []
     seen_urls = set()
     
-    for rss_url in rss_sources:
-        try:
-            feed = feedparser.parse(rss_url)
-            for entry in feed.entries[:10]:
-                if entry.link not in seen_urls:
-                    seen_urls.add(entry.link)
-                    all_articles.append({
-                        "title": entry.title,
-                        "link": entry.link,
-                        "published": entry.published
-                    })
-        except Exception as e:
-            print(f"Error fetching from {rss_url[:40]}...: {e}")
+    cache = FeedCache() if use_cache else None
+    try:
+        feeds = fetch_feeds(rss_sources, cache)
+    finally:
+        if cache:
+            cache.close()
+
+    for rss_url, entries in zip(rss_sources, feeds):
+        if isinstance(entries, BaseException):
+            print(f"Error fetching from {rss_url[:40]}...: {entries!r}")
             continue
+        for entry in entries[:10]:
+            if entry["link"] and entry["link"] not in seen_urls:
+                seen_urls.add(entry["link"])
+                all_articles.append(entry)
     
     print(f"Found {len(all_articles)} unique articles across Delaware.")
     return all_articles
 
-def analyze_news_with_grok(articles):
-    print("Step 2: Grok analysis and filtering...")
-    if not articles: return []
+def apply_news_rules(articles):
+    # Drop obvious roadwork/paving headlines locally (rules.json) before paying for analysis
+    kept = [article for article in articles if NEWS_RULES.rejection(article) is None]
+    if len(kept) < len(articles):
+        print(f"Excluded {len(articles) - len(kept)} headlines by local rules.")
+        NEWS_RULES.print_hit_counts()
+    return kept
+
+def _estimate_tokens(text):
+    # Rough English/JSON average of ~4 characters per token
+    return len(text) // 4 + 1
+
+def _prompt_article(article):
+    # Folded near-duplicate sources are attached to the result afterwards, not sent to the model
+    return {key: value for key, value in article.items() if key != "sources"}
+
+def chunk_articles(articles, max_tokens=ANALYSIS_CHUNK_TOKENS):
+    chunks = []
+    current, current_tokens = [], 0
+    for article in articles:
+        tokens = _estimate_tokens(json.dumps(_prompt_article(article)))
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(article)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
 
+def _analyze_chunk(articles):
     prompt = f"""
     Analyze these Delaware news headlines.
     
@@ -79,40 +223,143 @@ def analyze_news_with_grok(articles):
     EXTRACT: title, source_url, sector, summary (2-3 sentences), location, estimated_sq_ft, project_value, developer, contractor, project_phase, opportunity_score (1-10).
     
     Return ONLY a JSON array. Use null for unknown values.
-    Headlines: {json.dumps(articles)}
+    Headlines: {json.dumps([_prompt_article(article) for article in articles])}
     """
+    if any(article.get("body") for article in articles):
+        prompt += "    Where a headline has a body excerpt, take the extracted fields from the excerpt rather than guessing from the headline.\n"
     
-    try:
-        response = client.chat.completions.create(
+    messages = [
+        {"role": "system", "content": "You are a construction analyst. Return valid JSON only."},
+        {"role": "user", "content": prompt}
+    ]
+    
+    def response_chunks():
+        completion = clients.openai_client().chat.completions.create(
             model="grok-4-1-fast-non-reasoning",
-            messages=[
-                {"role": "system", "content": "You are a construction analyst. Return valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
+            messages=messages,
+            temperature=0.1,
+            timeout=ANALYSIS_TIMEOUT,
+            stream=True,
         )
-        content = response.choices[0].message.content.strip()
-        # Cleaning markdown formatting if Grok adds it
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        return json.loads(content)
-    except Exception as e:
-        print(f"Grok Analysis Error: {e}")
-        return []
+        yield from openai_chunks(completion)
+    
+    # Parse items as they stream in; markdown fences and trailing commas are tolerated.
+    # Identical chunks (e.g. a re-run after a webhook failure) are answered from the response cache.
+    stream = JSONObjectStream()
+    key = cache_key(model="grok-4-1-fast-non-reasoning", messages=messages, temperature=0.1)
+    results = list(iter_json_objects(
+        cached_chunks("news_analysis", key, response_chunks,
+                      store_if=lambda: not stream.incomplete and not stream.errors), stream
+    ))
+    if stream.incomplete:
+        # A cut-off answer would silently drop headlines, so let the chunk be retried
+        raise ValueError(f"response ended mid-object after {len(results)} item(s)")
+    if stream.errors:
+        # Same for an object that didn't parse: its headline would be recorded as rejected
+        raise ValueError(f"{stream.errors} malformed item(s) in the response")
+    return results
+
+def _analyze_chunk_with_retry(chunk_number, articles):
+    for attempt in range(1, ANALYSIS_RETRIES + 1):
+        try:
+            return _analyze_chunk(articles)
+        except Exception as e:
+            print(f"Grok Analysis Error (chunk {chunk_number}, attempt {attempt}/{ANALYSIS_RETRIES}): {e}")
+            if attempt < ANALYSIS_RETRIES:
+                pipeline.record(retries=1)
+                time.sleep(2 ** attempt)
+    return None
+
+def analyze_news_with_grok(articles, seen=None):
+    print("Step 2: Grok analysis and filtering...")
+    if not articles: return []
+
+    chunks = chunk_articles(articles)
+    print(f"Analyzing {len(articles)} headlines in {len(chunks)} chunk(s)...")
+    with ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS) as pool:
+        chunk_results = list(pool.map(_analyze_chunk_with_retry, range(1, len(chunks) + 1), chunks))
+
+    # Merge in headline order; a failed chunk only loses its own headlines
+    results = []
+    failed = 0
+    for chunk, chunk_result in zip(chunks, chunk_results):
+        if chunk_result is None:
+            failed += 1
+            continue
+        for article, result in zip(chunk, match_results(chunk, chunk_result)):
+            if result is not None and article.get("sources"):
+                result["sources"] = article["sources"]
+        if seen is not None:
+            # Only remember headlines once the model has actually answered for them
+            seen.record(chunk, chunk_result)
+        results.extend(chunk_result)
+
+    if failed:
+        print(f"Grok Analysis: {failed} of {len(chunks)} chunk(s) failed; those headlines will be retried next run.")
+    return results
 
 def send_to_lovable(news_items):
     if not news_items:
         print("No relevant news to send.")
-        return
+        uploader.replay_spool(WEBHOOK_URL, "news")
+        return False
     
     print(f"Step 3: Sending {len(news_items)} items to Lovable...")
-    try:
-        response = requests.post(WEBHOOK_URL, json={"news": news_items}, timeout=30)
-        print(f"Status: {response.status_code}")
-    except Exception as e:
-        print(f"Request Error: {e}")
+    delivered = uploader.upload_delta(WEBHOOK_URL, "news", news_items)
+    print("Status: delivered" if delivered else "Status: failed; batches spooled for the next run")
+    return delivered
 
 if __name__ == "__main__":
-    raw_news = get_delaware_news()
-    filtered_news = analyze_news_with_grok(raw_news)
-    send_to_lovable(filtered_news)
+    parser = argparse.ArgumentParser(description="Delaware construction news sweep")
+    parser.add_argument("--fetch-articles", action="store_true", default=FETCH_ARTICLES,
+                        help="download article text for new headlines before analysis (or set NEWS_FETCH_ARTICLES=1)")
+    parser.add_argument("--no-prefilter", action="store_true",
+                        help="send every new headline to Grok, skipping the local relevance pre-filter")
+    response_cache.add_arguments(parser)
+    uploader.add_arguments(parser)
+    pipeline.add_arguments(parser)
+    args = parser.parse_args()
+    response_cache.configure(args)
+    uploader.configure(args)
+    
+    run = Pipeline("news", profile=args.profile)
+    try:
+        with run.stage("fetch") as stage:
+            raw_news = get_delaware_news()
+            stage.items_out = len(raw_news)
+        
+        # One article per story; syndicated copies become its "sources"
+        with run.stage("cluster", items_in=len(raw_news)) as stage:
+            raw_news = cluster_articles(raw_news)
+            stage.items_out = len(raw_news)
+        
+        seen = SeenArticles()
+        try:
+            with run.stage("validate", items_in=len(raw_news)) as stage:
+                new_news, reused_news = seen.split(apply_news_rules(raw_news))
+                print(f"Skipping already-analyzed headlines: {len(reused_news)} earlier results reused, {len(new_news)} new.")
+                if not args.no_prefilter:
+                    # Trained on every headline Grok has accepted or rejected so far
+                    new_news = prefilter(new_news, RelevanceModel(seen.labeled_titles()))
+                stage.items_out = len(new_news)
+            if args.fetch_articles:
+                with run.stage("enrich", items_in=len(new_news)) as stage:
+                    new_news = enrich_articles(new_news)
+                    stage.items_out = sum(1 for article in new_news if article.get("body"))
+            with run.stage("analyze", items_in=len(new_news)) as stage:
+                filtered_news = analyze_news_with_grok(new_news, seen) + reused_news
+                stage.items_out = len(filtered_news)
+        finally:
+            seen.close()
+        
+        registry = FirmRegistry()
+        try:
+            with run.stage("link", items_in=len(filtered_news)) as stage:
+                stage.items_out = registry.link_news(filtered_news)
+        finally:
+            registry.close()
+        
+        with run.stage("upload", items_in=len(filtered_news)) as stage:
+            stage.items_out = len(filtered_news) if send_to_lovable(filtered_news) else 0
+    finally:
+        run.finish()
@@ -0,0 +1,121 @@
+import os
+import io
+import json
+import time
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+import storage
+
+# Stage-level instrumentation shared by the three scouts. Each run is split into
+# named stages (fetch, analyze, validate, upload, ...); every stage records wall
+# time, items in/out, bytes, retries and token usage, which are appended as JSON
+# lines to the metrics file so slow runs can be compared against earlier ones.
+METRICS_FILE = os.environ.get("SCOUT_METRICS_FILE", os.path.join(storage.CACHE_DIR, "metrics.jsonl"))
+
+# Callables that receive each finished stage's metrics dict (e.g. to forward to a tracer)
+STAGE_HOOKS = []
+
+_lock = threading.Lock()
+_current_stage = None
+
+class StageMetrics:
+    def __init__(self, pipeline, name, items_in=None):
+        self.pipeline = pipeline
+        self.name = name
+        self.items_in = items_in
+        self.items_out = None
+        self.bytes = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.wall_time = 0.0
+        self.error = None
+
+    def as_dict(self):
+        return {
+            "pipeline": self.pipeline,
+            "stage": self.name,
+            "wall_time": round(self.wall_time, 3),
+            "items_in": self.items_in,
+            "items_out": self.items_out,
+            "bytes": self.bytes,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "error": self.error,
+        }
+
+def record(bytes=0, retries=0, prompt_tokens=0, completion_tokens=0):
+    # Adds to the running stage; safe to call from worker threads and a no-op outside a pipeline
+    with _lock:
+        stage = _current_stage
+        if stage is None:
+            return
+        stage.bytes += bytes
+        stage.retries += retries
+        stage.prompt_tokens += prompt_tokens or 0
+        stage.completion_tokens += completion_tokens or 0
+
+class Pipeline:
+    def __init__(self, name, profile=False, metrics_file=METRICS_FILE):
+        self.name = name
+        self.metrics_file = metrics_file
+        self.run_id = time.strftime("%Y%m%dT%H%M%S")
+        self.stages = []
+        self.profiler = cProfile.Profile() if profile else None
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, items_in=None):
+        global _current_stage
+        metrics = StageMetrics(self.name, name, items_in)
+        with _lock:
+            _current_stage = metrics
+        if self.profiler:
+            self.profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield metrics
+        except BaseException as e:
+            metrics.error = repr(e)
+            raise
+        finally:
+            metrics.wall_time = time.perf_counter() - start
+            if self.profiler:
+                self.profiler.disable()
+            with _lock:
+                _current_stage = None
+            self.stages.append(metrics)
+            for hook in STAGE_HOOKS:
+                hook(metrics.as_dict())
+
+    def finish(self):
+        total = time.perf_counter() - self.started
+        print(f"\n⏱️  {self.name} pipeline finished in {total:.1f}s")
+        for metrics in self.stages:
+            tokens = metrics.prompt_tokens + metrics.completion_tokens
+            print(
+                f"   {metrics.name:<10} {metrics.wall_time:7.2f}s  in={metrics.items_in} out={metrics.items_out} "
+                f"bytes={metrics.bytes} retries={metrics.retries} tokens={tokens}"
+                + (f"  error={metrics.error}" if metrics.error else "")
+            )
+
+        if self.metrics_file:
+            os.makedirs(os.path.dirname(self.metrics_file) or ".", exist_ok=True)
+            with open(self.metrics_file, "a", encoding="utf-8") as f:
+                for metrics in self.stages:
+                    f.write(json.dumps({"run_id": self.run_id, **metrics.as_dict()}) + "\n")
+                f.write(json.dumps({"run_id": self.run_id, "pipeline": self.name, "stage": "total", "wall_time": round(total, 3)}) + "\n")
+
+        if self.profiler:
+            # Note: cProfile only sees the main thread; worker pools show up as waits
+            path = os.path.join(os.path.dirname(self.metrics_file) or ".", f"{self.name}-{self.run_id}.prof")
+            self.profiler.dump_stats(path)
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(15)
+            print(f"\n🔬 Profile saved to {path}\n{out.getvalue()}")
+
+def add_arguments(parser):
+    parser.add_argument("--profile", action="store_true", help="profile each stage with cProfile")
@@ -0,0 +1,89 @@
+import os
+import re
+import math
+from collections import Counter
+from seen_articles import headline_text, normalize_title
+
+# Local relevance pre-filter for news headlines: a naive Bayes log-odds score
+# over words and word pairs, trained on the headlines Grok has accepted or
+# rejected before (seen_articles labels) on top of a small seed vocabulary,
+# so it is useful from the first run. Scoring a headline is a handful of
+# dict lookups.
+
+# Headlines scoring below this probability of being relevant are dropped (0 disables dropping)
+RELEVANCE_DROP_BELOW = float(os.environ.get("NEWS_RELEVANCE_DROP_BELOW", "0.1"))
+# Learned labels needed on each side before the model may drop anything
+RELEVANCE_MIN_EXAMPLES = int(os.environ.get("NEWS_RELEVANCE_MIN_EXAMPLES", "25"))
+# Pseudo-count given to each seed term, and the Laplace smoothing for all terms
+SEED_WEIGHT = float(os.environ.get("NEWS_RELEVANCE_SEED_WEIGHT", "3"))
+SMOOTHING = 1.0
+
+SEED_TERMS = {
+    True: [
+        "construction", "proposed", "approved", "approves", "zoning", "rezoning", "site plan", "breaking ground",
+        "groundbreaking", "apartment", "apartments", "hospital", "medical", "school", "campus", "hotel",
+        "facility", "development", "expansion", "renovation", "senior living", "mixed use", "building", "planned",
+    ],
+    False: [
+        "paving", "repaving", "road", "route", "lane", "closure", "detour", "bridge", "traffic", "sells",
+        "sold", "sold <num>", "home sale", "crash", "police", "arrest", "obituary", "weather", "game", "lottery",
+    ],
+}
+
+STOPWORDS = {"a", "an", "the", "of", "in", "on", "at", "for", "to", "and", "or", "is", "are", "with", "by", "as", "from", "de"}
+
+def tokens(title):
+    words = [word for word in normalize_title(headline_text(title)).split() if word not in STOPWORDS]
+    # Numbers vary per story ("120-unit"); their presence is what matters
+    words = ["<num>" if re.fullmatch(r"\d+", word) else word for word in words]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+class RelevanceModel:
+    def __init__(self, labeled_titles=()):
+        self.counts = {True: Counter(), False: Counter()}
+        self.examples = {True: 0, False: 0}
+        for accepted, terms in SEED_TERMS.items():
+            for term in terms:
+                self.counts[accepted][term] += SEED_WEIGHT
+        for title, accepted in labeled_titles:
+            self.counts[accepted].update(set(tokens(title)))
+            self.examples[accepted] += 1
+        self._compile()
+
+    def _compile(self):
+        # Precompute one log-likelihood ratio per known term
+        totals = {label: sum(counts.values()) for label, counts in self.counts.items()}
+        vocabulary = set(self.counts[True]) | set(self.counts[False])
+        size = len(vocabulary) or 1
+        self.weights = {
+            term: math.log((self.counts[True][term] + SMOOTHING) / (totals[True] + SMOOTHING * size))
+            - math.log((self.counts[False][term] + SMOOTHING) / (totals[False] + SMOOTHING * size))
+            for term in vocabulary
+        }
+        positives, negatives = self.examples[True] + 1, self.examples[False] + 1
+        self.prior = math.log(positives / negatives)
+
+    @property
+    def trained(self):
+        return min(self.examples.values()) >= RELEVANCE_MIN_EXAMPLES
+
+    def score(self, title):
+        # Probability (0-1) that the model would keep this headline
+        log_odds = self.prior + sum(self.weights.get(term, 0.0) for term in tokens(title))
+        log_odds = max(-30.0, min(30.0, log_odds))
+        return 1 / (1 + math.exp(-log_odds))
+
+def prefilter(articles, model, drop_below=RELEVANCE_DROP_BELOW):
+    # Sorts articles most-likely-relevant first and, once the model has seen enough
+    # labeled history, drops clear negatives. Articles themselves are not modified,
+    # so prompts and response cache keys stay the same.
+    scored = sorted(((model.score(article.get("title")), article) for article in articles),
+                    key=lambda item: item[0], reverse=True)
+    if not model.trained or drop_below <= 0:
+        print(f"Relevance pre-filter: ranking only ({model.examples[True]} accepted / "
+              f"{model.examples[False]} rejected labels, {RELEVANCE_MIN_EXAMPLES} of each needed to drop)")
+        return [article for _, article in scored]
+    kept = [article for score, article in scored if score >= drop_below]
+    print(f"Relevance pre-filter: dropped {len(scored) - len(kept)} of {len(scored)} headlines "
+          f"scoring below {drop_below:.2f}")
+    return kept
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import storage
+
+# Content-addressed cache of model responses, keyed by model, prompt, tools and
+# parameters, so re-running a pipeline after a downstream failure costs no tokens.
+RESPONSE_CACHE_MAX_BYTES = int(float(os.environ.get("SCOUT_RESPONSE_CACHE_MAX_MB", "50")) * 1024 * 1024)
+
+# Default time-to-live per call site, overridable with SCOUT_RESPONSE_CACHE_TTL_<SITE> (seconds)
+CACHE_TTLS = {
+    "firms": 7 * 86400,
+    "news_analysis": 2 * 86400,
+    "leads": 12 * 3600,
+    "architect": 7 * 86400,
+}
+
+# "use" reads and writes, "refresh" skips reads but stores fresh answers, "off" bypasses the cache
+CACHE_MODE = "use"
+
+_lock = threading.Lock()
+_cache = None
+
+def cache_key(**parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def ttl_for(site):
+    return float(os.environ.get(f"SCOUT_RESPONSE_CACHE_TTL_{site.upper()}", CACHE_TTLS.get(site, 86400)))
+
+class ResponseCache:
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.conn = storage.connect("responses", check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                site TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key, ttl):
+        with _lock:
+            row = self.conn.execute("SELECT text, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or time.time() - row["created_at"] > ttl:
+                return None
+            self.conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row["text"]
+
+    def put(self, key, site, text):
+        now = time.time()
+        with _lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, site, text, size, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, site, text, len(text.encode("utf-8")), now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        # Drop least recently used responses until the cache fits in max_bytes
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for row in self.conn.execute("SELECT key, size FROM responses ORDER BY used_at").fetchall():
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (row["key"],))
+            total -= row["size"]
+            if total <= self.max_bytes:
+                break
+
+def get_cache():
+    global _cache
+    with _lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+def cached_chunks(site, key, produce, store_if=None):
+    # Yields the response text for `key`: the cached copy as one chunk if there is
+    # a fresh one, otherwise the live chunks from produce(), stored once complete.
+    if CACHE_MODE == "off":
+        yield from produce()
+        return
+
+    cache = get_cache()
+    if CACHE_MODE == "use":
+        text = cache.get(key, ttl_for(site))
+        if text is not None:
+            print(f"💾 Using cached {site} response")
+            yield text
+            return
+
+    chunks = []
+    for chunk in produce():
+        chunks.append(chunk)
+        yield chunk
+    if store_if is None or store_if():
+        cache.put(key, site, "".join(chunks))
+
+def add_arguments(parser):
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the model response cache")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached model responses but store the new ones")
+
+def configure(args):
+    global CACHE_MODE
+    CACHE_MODE = "off" if args.no_cache else "refresh" if args.refresh else "use"
@@ -0,0 +1,109 @@
+import os
+import re
+import sys
+import json
+from collections import Counter, namedtuple
+
+# Reject/warn rules live in rules.json so they can be changed without touching code.
+# For each field, the keywords and patterns of every rule that applies to it
+# are compiled into one regex, so a field is scanned once whatever the number of rules.
+RULES_FILE = os.environ.get("SCOUT_RULES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules.json"))
+
+RuleHit = namedtuple("RuleHit", ["rule", "field", "text"])
+
+class Rule:
+    def __init__(self, config):
+        self.id = config["id"]
+        self.action = config.get("action", "reject")
+        self.message = config.get("message", self.id)
+        self.fields = set(config["fields"])
+        self.pattern = "|".join(
+            [re.escape(keyword) for keyword in config.get("keywords", [])] + list(config.get("patterns", []))
+        )
+        if self.action not in ("reject", "warn"):
+            raise ValueError(f"Rule {self.id}: unknown action {self.action!r}")
+        if not self.pattern:
+            raise ValueError(f"Rule {self.id}: needs keywords or patterns")
+        self.regex = re.compile(self.pattern, re.IGNORECASE)
+
+class RuleSet:
+    def __init__(self, rules):
+        self.rules = [Rule(config) for config in rules]
+        # field -> (indexes of the rules that apply to it, one regex for all of them).
+        # Each rule is a named group inside a lookahead so matches can overlap.
+        self.field_regexes = {}
+        for field in sorted({field for rule in self.rules for field in rule.fields}):
+            indexes = [i for i, rule in enumerate(self.rules) if field in rule.fields]
+            self.field_regexes[field] = (indexes, re.compile(
+                "(?=" + "|".join(f"(?P<r{i}>{self.rules[i].pattern})" for i in indexes) + ")",
+                re.IGNORECASE,
+            ))
+        self.hit_counts = Counter()
+
+    def evaluate(self, record):
+        # Returns one RuleHit per rule that matched, in rule order
+        hits = {}
+        for field, (indexes, regex) in self.field_regexes.items():
+            value = record.get(field)
+            if isinstance(value, list):
+                value = " ".join(str(item) for item in value)
+            if not value:
+                continue
+            text = str(value)
+            matched = False
+            for match in regex.finditer(text):
+                matched = True
+                index = int(match.lastgroup[1:])
+                hits.setdefault(index, RuleHit(self.rules[index], field, match.group(match.lastgroup)))
+            if matched:
+                # Only the first rule listed is reported where two match at the same spot,
+                # so give the others that apply to this field their own look
+                for index in indexes:
+                    if index not in hits:
+                        match = self.rules[index].regex.search(text)
+                        if match:
+                            hits[index] = RuleHit(self.rules[index], field, match.group())
+        for index in hits:
+            self.hit_counts[self.rules[index].id] += 1
+        return [hits[index] for index in sorted(hits)]
+
+    def rejection(self, record):
+        # The first reject hit for a record, or None
+        return next((hit for hit in self.evaluate(record) if hit.rule.action == "reject"), None)
+
+    def print_hit_counts(self, label="Rule hits"):
+        if self.hit_counts:
+            counts = ", ".join(f"{rule.id}={self.hit_counts[rule.id]}" for rule in self.rules if self.hit_counts[rule.id])
+            print(f"📋 {label}: {counts}")
+
+def load_rules(section, path=RULES_FILE):
+    with open(path, encoding="utf-8") as f:
+        return RuleSet(json.load(f).get(section, []))
+
+# Records whose outcome must not change when rules.json is edited: (section, record, expected reject rule id or None)
+REGRESSION_CASES = [
+    ("leads", {"project_stage": "Construction underway"}, "active_construction_stage"),
+    ("leads", {"project_stage": "Construction Started"}, "active_construction_stage"),
+    ("leads", {"project_stage": "Construction started", "description": "Construction started in May"}, "construction_started"),
+    ("leads", {"project_stage": "Pre-construction"}, None),
+    ("leads", {"project_stage": "Pre construction / Design Development"}, None),
+    ("leads", {"project_stage": "Design Development", "timeline": "Breaking ground next spring"}, "construction_started"),
+    ("news", {"title": "DelDOT to begin repaving Route 1"}, "roadwork"),
+    ("news", {"title": "Planning commission approves apartments in Dover"}, None),
+    ("news", {"title": "DelDOT approves entrance for 300-home Milford development"}, None),
+    ("news", {"title": "DelDOT headquarters renovation awarded"}, None),
+    ("news", {"title": "New Bayhealth campus paving the way for 200 jobs"}, None),
+    ("news", {"title": "Traffic detour planned as Wilmington hospital tower rises"}, None),
+    ("news", {"title": "Crews resurfacing Route 13 near Smyrna"}, "roadwork"),
+]
+
+if __name__ == "__main__":
+    # python rules.py - checks the rules file against REGRESSION_CASES
+    failures = 0
+    for section, record, expected in REGRESSION_CASES:
+        hit = load_rules(section).rejection(record)
+        if (hit.rule.id if hit else None) != expected:
+            failures += 1
+            print(f"❌ {section} {record}: expected {expected}, got {hit.rule.id if hit else None}")
+    print(f"{len(REGRESSION_CASES) - failures}/{len(REGRESSION_CASES)} rule checks passed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,28 @@
+import sys
+import runpy
+
+# Single entry point for the scouts. Only the chosen scout's module is imported:
+#   python scout.py news [--no-cache] [--profile]
+#   python scout.py leads [--fanout] [--query N]
+#   python scout.py firms
+SCOUTS = {
+    "news": ("news_scraper", "Delaware construction news sweep"),
+    "leads": ("spectrum_scout", "Pre-bid construction lead scout"),
+    "firms": ("firm_scraper", "Top Delaware architecture/design firms"),
+}
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in SCOUTS:
+        print("usage: python scout.py {" + ",".join(SCOUTS) + "} [options]\n")
+        for name, (module, description) in SCOUTS.items():
+            print(f"  {name:<6} {description} ({module}.py)")
+        return 0 if argv and argv[0] in ("-h", "--help") else 2
+
+    module, _ = SCOUTS[argv[0]]
+    sys.argv = [sys.argv[0]] + argv[1:]
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import os
+import re
+import json
+import time
+import hashlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import storage
+
+# How long an analyzed headline is remembered. Must outlive the 4-day RSS lookback.
+SEEN_TTL_DAYS = float(os.environ.get("NEWS_SEEN_TTL_DAYS", "10"))
+# Accepted/rejected headline text kept for training the relevance pre-filter
+LABEL_TTL_DAYS = float(os.environ.get("NEWS_LABEL_TTL_DAYS", "180"))
+
+def normalize_link(link):
+    parts = urlsplit((link or "").strip())
+    query = [(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")]
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), urlencode(query), ""))
+
+def normalize_title(title):
+    title = re.sub(r"[^\w\s]", " ", (title or "").lower())
+    return re.sub(r"\s+", " ", title).strip()
+
+def headline_text(title):
+    # Google News titles end in " - Publisher"; the publisher says nothing about the story
+    return re.sub(r"\s+-\s+(?:(?!\s-\s).)+$", "", (title or "").strip())
+
+def _hash(kind, value):
+    return f"{kind}:" + hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+def article_keys(link, title):
+    keys = []
+    if link:
+        keys.append(_hash("link", normalize_link(link)))
+    if normalize_title(title):
+        keys.append(_hash("title", normalize_title(title)))
+    return keys
+
+def story_keys(article):
+    # Keys for an article plus every near-duplicate folded into it (see clustering.py)
+    keys = article_keys(article.get("link"), article.get("title"))
+    for source in article.get("sources", []):
+        keys += [key for key in article_keys(source.get("link"), source.get("title")) if key not in keys]
+    return keys
+
+def match_results(articles, results):
+    # The model's result for each article (matched by link, then title), or None if it was left out
+    by_key = {}
+    for result in results:
+        for key in article_keys(result.get("source_url"), result.get("title")):
+            by_key.setdefault(key, result)
+    return [
+        next((by_key[key] for key in article_keys(article.get("link"), article.get("title")) if key in by_key), None)
+        for article in articles
+    ]
+
+class SeenArticles:
+    def __init__(self, ttl_days=SEEN_TTL_DAYS):
+        self.ttl = ttl_days * 86400
+        self.conn = storage.connect("seen_articles")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (
+                key TEXT PRIMARY KEY,
+                result TEXT,
+                analyzed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS labels (
+                title TEXT PRIMARY KEY,
+                accepted INTEGER NOT NULL,
+                labeled_at REAL NOT NULL
+            );
+        """)
+        self.conn.execute("DELETE FROM seen WHERE analyzed_at < ?", (time.time() - self.ttl,))
+        self.conn.execute("DELETE FROM labels WHERE labeled_at < ?", (time.time() - LABEL_TTL_DAYS * 86400,))
+        self.conn.commit()
+
+    def _lookup(self, keys):
+        for key in keys:
+            row = self.conn.execute("SELECT result FROM seen WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                return row
+        return None
+
+    def split(self, articles):
+        # Returns (articles never analyzed, stored results for ones already analyzed)
+        new_articles = []
+        reused = []
+        reused_ids = set()
+        for article in articles:
+            row = self._lookup(story_keys(article))
+            if row is None:
+                new_articles.append(article)
+            elif row["result"] and row["result"] not in reused_ids:
+                # Rejected headlines are stored with a NULL result and simply dropped
+                reused_ids.add(row["result"])
+                reused.append(json.loads(row["result"]))
+        return new_articles, reused
+
+    def record(self, articles, results):
+        now = time.time()
+        for article, result in zip(articles, match_results(articles, results)):
+            stored = json.dumps(result) if result is not None else None
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO seen (key, result, analyzed_at) VALUES (?, ?, ?)",
+                [(key, stored, now) for key in story_keys(article)],
+            )
+            title = headline_text(article.get("title"))
+            if title:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO labels (title, accepted, labeled_at) VALUES (?, ?, ?)",
+                    (title, result is not None, now),
+                )
+        self.conn.commit()
+
+    def labeled_titles(self):
+        # [(title, accepted)] for every headline the model has answered for
+        return [(row["title"], bool(row["accepted"])) for row in self.conn.execute("SELECT title, accepted FROM labels")]
+
+    def close(self):
+        self.conn.close()
@@ -1,23 +1,48 @@
 import os
-import json
+import argparse
 import re
-import requests
-from xai_sdk import Client
-from xai_sdk.chat import user, system
-from xai_sdk.tools import web_search
+import time
+from concurrent.futures import ThreadPoolExecutor
+import clients
+from json_stream import JSONObjectStream, iter_json_objects, xai_chunks
+from lead_store import LeadStore
+from geo import location_flags
+from firm_registry import FirmRegistry
+from rules import load_rules
+from textmatch import normalize_text
+import response_cache
+from response_cache import cache_key, cached_chunks
+import uploader
+import pipeline
+from pipeline import Pipeline
 
-# 1. Setup xAI Client with web search capabilities
-client = Client(api_key=os.environ.get("XAI_API_KEY"))
+# 1. xAI client (with web search) is created on first use by clients.xai_chat()
 
 # 2. Update these in your GitHub Secrets or Environment
 WEBHOOK_URL = os.environ.get("SUPABASE_WEBHOOK_URL") 
 SUPABASE_ANON_KEY = os.environ.get("SUPABASE_ANON_KEY")
 
-def get_leads():
-    print("Step 1: Searching web for Delaware Vertical Construction leads with real-time data...")
-    
-    # System prompt to guide the AI's behavior
-    system_prompt = """You are a construction market intelligence specialist with web search capabilities.
+LEAD_RULES = load_rules("leads")
+
+# Fan-out mode: each search query runs as its own chat session in a bounded pool
+FANOUT_WORKERS = int(os.environ.get("SCOUT_FANOUT_WORKERS", "4"))
+FANOUT_RETRIES = int(os.environ.get("SCOUT_FANOUT_RETRIES", "2"))
+FANOUT_PROJECTS_PER_QUERY = int(os.environ.get("SCOUT_FANOUT_PROJECTS_PER_QUERY", "5"))
+
+# Searches run inside the single agentic prompt, or one chat each in fan-out mode
+SEARCH_QUERIES = [
+    "Delaware planning board approval 2025 2026",
+    "Delaware zoning approval commercial development",
+    "Delaware architect firm project announcement",
+    "Delaware construction project design phase",
+    "Delaware building permit application 2025",
+    "New Castle County development proposal",
+    "Kent County Delaware construction plans",
+    "Sussex County Delaware building project",
+    "Delaware architectural firm selected design",
+]
+
+SYSTEM_PROMPT = """You are a construction market intelligence specialist with web search capabilities.
 
 Your mission: Find projects BEFORE they go to bid by monitoring:
 - Planning board meetings and approvals
@@ -37,45 +62,30 @@ Focus on the 6-18 month window BEFORE bidding begins.
 Always verify information with real sources and include URLs.
 Return ONLY valid JSON - no introductory text."""
 
-    # User prompt with specific search instructions
-    user_prompt = """Find 10 REAL vertical construction projects in Delaware that are currently in PLANNING or DESIGN phase (NOT yet out to bid).
-
-CRITICAL DATE FILTERING:
+DATE_FILTERING = """CRITICAL DATE FILTERING:
 - TODAY'S DATE: January 10, 2026
 - Only include projects where construction has NOT YET STARTED
 - Exclude any project with "groundbreaking", "construction began", "under construction", "topped out", "nearing completion"
 - Target: Projects with construction start dates in FUTURE (Q2 2026 or later)
-- After finding each project, VERIFY it hasn't started construction yet by searching "[project name] construction status 2026"
-
-SEARCH QUERIES TO RUN:
-1. "Delaware planning board approval 2025 2026"
-2. "Delaware zoning approval commercial development"
-3. "Delaware architect firm project announcement"
-4. "Delaware construction project design phase"
-5. "Delaware building permit application 2025"
-6. "New Castle County development proposal"
-7. "Kent County Delaware construction plans"
-8. "Sussex County Delaware building project"
-9. "Delaware architectural firm selected design"
-10. "[Project name] architect Delaware" (for each project found)
+- After finding each project, VERIFY it hasn't started construction yet by searching "[project name] construction status 2026\""""
 
-VERIFICATION STEP (CRITICAL):
+VERIFICATION_RULES = """VERIFICATION STEP (CRITICAL):
 For each project found, search to confirm current status:
 - "[Project name] Delaware construction status"
 - "[Project name] groundbreaking date"
 - Look for recent news (last 30 days) about the project
-- If you find "construction started", "workers on site", "framing complete" - REJECT IT
+- If you find "construction started", "workers on site", "framing complete" - REJECT IT"""
 
-CRITICAL: ARCHITECT/DESIGNER INFORMATION IS PRIORITY
+ARCHITECT_RULES = """CRITICAL: ARCHITECT/DESIGNER INFORMATION IS PRIORITY
 For EVERY project, make additional searches to find the architect/designer:
 - Search the project name + "architect" or "designer"
 - Check architectural firm websites and project portfolios
 - Look for design award announcements
 - Search permit records which often list architect of record
 - Check local AIA chapter announcements
-- If not found initially, search "[developer name] architect Delaware"
+- If not found initially, search "[developer name] architect Delaware\""""
 
-PROJECT STAGE KEYWORDS TO FIND:
+SCOPE_RULES = """PROJECT STAGE KEYWORDS TO FIND:
 - "Planning approval", "Zoning approved", "Site plan submitted"
 - "Design contract awarded to [architect]"
 - "Architectural firm announces", "Selected to design"
@@ -99,9 +109,9 @@ FOCUS ON: Buildings requiring interior finishes and flooring:
 - Apartment/multifamily housing
 - Hotels and hospitality
 - Senior living facilities
-- Retail and mixed-use
+- Retail and mixed-use"""
 
-For each project, return a JSON object with these fields:
+LEAD_FORMAT = """For each project, return a JSON object with these fields:
 {
   "name": "Full project name",
   "address": "Street address or 'Site location TBD'",
@@ -140,43 +150,46 @@ JSON format:
   ...
 ]"""
 
+def _numbered_queries():
+    lines = [f'{n}. "{query}"' for n, query in enumerate(SEARCH_QUERIES, 1)]
+    lines.append(f'{len(SEARCH_QUERIES) + 1}. "[Project name] architect Delaware" (for each project found)')
+    return "\n".join(lines)
+
+USER_PROMPT = (
+    "Find 10 REAL vertical construction projects in Delaware that are currently in PLANNING or DESIGN phase (NOT yet out to bid).\n\n"
+    + DATE_FILTERING + "\n\nSEARCH QUERIES TO RUN:\n" + _numbered_queries() + "\n\n"
+    + VERIFICATION_RULES + "\n\n" + ARCHITECT_RULES + "\n\n" + SCOPE_RULES + "\n\n" + LEAD_FORMAT
+)
+
+def _query_prompt(query):
+    # Fan-out mode: one focused search per chat; architects are looked up in a second stage
+    return (
+        f"Find up to {FANOUT_PROJECTS_PER_QUERY} REAL vertical construction projects in Delaware that are currently in PLANNING or DESIGN phase (NOT yet out to bid).\n\n"
+        f'Start from this web search: "{query}" and follow up on what it turns up. '
+        "Include the architect/designer whenever your sources name one.\n\n"
+        + DATE_FILTERING + "\n\n" + VERIFICATION_RULES + "\n\n" + SCOPE_RULES + "\n\n" + LEAD_FORMAT
+    )
+
+def _architect_prompt(lead):
+    return (
+        f"Find the architect or design firm of record for the Delaware construction project "
+        f"\"{lead.get('name')}\" in {lead.get('city') or 'Delaware'} (source: {lead.get('source_url')}). "
+        "Search the project name with \"architect\" or \"designer\", permit records, and architectural firm portfolios. "
+        "Return ONLY a JSON object: {\"designer\": \"Firm name or null if not found\", \"designer_source_url\": \"URL confirming it or null\"}"
+    )
+
+def _missing_designer(lead):
+    designer = str(lead.get('designer') or '').strip().lower()
+    return designer in ['', 'tbd', 'n/a'] or 'pending' in designer or 'seeking' in designer
+
+def validate_leads(leads):
+    # Shared validation and in-run dedup for leads from any source/mode
+    validated_leads = []
+    rejected_count = 0
+    seen_addresses = {}  # Track addresses to detect duplicates
+    seen_names = {}
+    
     try:
-        # Create chat with web search enabled
-        chat = client.chat.create(
-            model="grok-4-1-fast",  # Use reasoning model for better search capabilities
-            tools=[web_search()],   # Enable real-time web search
-        )
-        
-        # Add system and user messages
-        chat.append(system(system_prompt))
-        chat.append(user(user_prompt))
-        
-        # Get response with web search
-        print("🔍 Grok is now searching the web for real projects...")
-        response = chat.sample()
-        
-        raw_content = response.content.strip()
-        print(f"📄 Received response ({len(raw_content)} characters)")
-        
-        # Clean markdown formatting if present
-        if raw_content.startswith("```"):
-            lines = raw_content.split("\n")
-            raw_content = "\n".join(lines[1:-1])
-            if raw_content.startswith("json"):
-                raw_content = raw_content[4:].strip()
-        
-        # Fix common JSON formatting issues from AI responses
-        # Remove trailing commas before closing braces/brackets
-        raw_content = re.sub(r',(\s*[}\]])', r'\1', raw_content)
-        
-        # Parse JSON
-        leads = json.loads(raw_content)
-        
-        # Validation: Check for real URLs and pre-bid status
-        validated_leads = []
-        rejected_count = 0
-        seen_addresses = {}  # Track addresses to detect duplicates
-        
         for i, lead in enumerate(leads, 1):
             # Check for required fields
             if not lead.get('source_url') or not lead['source_url'].startswith('http'):
@@ -205,36 +218,30 @@ JSON format:
                 
                 seen_addresses[normalized_address] = lead.get('name')
             
-            # CRITICAL: Check if construction already started
-            description = lead.get('description', '').lower()
-            stage = lead.get('project_stage', '').lower()
-            construction_status = lead.get('construction_status', '').lower()
-            timeline = lead.get('timeline', '').lower()
-            
-            # Red flag keywords that indicate construction has started
-            started_keywords = [
-                'under construction', 'construction began', 'groundbreaking held',
-                'workers on site', 'framing complete', 'topped out', 'nearing completion',
-                'construction started', 'breaking ground', 'broke ground', 'construction underway',
-                'currently being built', 'construction is ongoing', 'opened in 20'
-            ]
-            
-            # Check if any red flag appears
-            is_already_started = any(keyword in description or keyword in construction_status or keyword in timeline 
-                                     for keyword in started_keywords)
-            
-            if is_already_started:
-                print(f"🚫 Project {i}: REJECTED '{lead.get('name')}' - Construction already started")
-                print(f"   Evidence: {description[:100]}...")
+            # Fan-out queries often surface the same project twice without a street address
+            normalized_name = normalize_text(lead.get('name'))
+            if normalized_name in seen_names:
+                print(f"🔄 Project {i}: DUPLICATE '{lead.get('name')}' - Already found as '{seen_names[normalized_name]}'")
                 rejected_count += 1
                 continue
+            seen_names[normalized_name] = lead.get('name')
             
-            # Warn if stage is "construction" without "pre-"
-            if 'construction' in stage and 'pre-construction' not in stage and 'pre construction' not in stage:
-                print(f"🚫 Project {i}: REJECTED '{lead.get('name')}' - Stage indicates active construction: {lead.get('project_stage')}")
+            # CRITICAL: Check if construction already started (reject/warn rules live in rules.json)
+            hits = LEAD_RULES.evaluate(lead)
+            rejection = next((hit for hit in hits if hit.rule.action == "reject"), None)
+            if rejection:
+                print(f"🚫 Project {i}: REJECTED '{lead.get('name')}' - {rejection.rule.message}")
+                print(f"   Evidence ({rejection.field}): {str(lead.get(rejection.field, ''))[:100]}...")
                 rejected_count += 1
                 continue
             
+            for hit in hits:
+                print(f"⚠️  Project {i}: '{lead.get('name')}' - {hit.rule.message} ('{hit.text}' in {hit.field})")
+            
+            # Coordinates outside Delaware or away from the stated county/city usually mean a bad geocode
+            for flag in location_flags(lead):
+                print(f"📍 Project {i}: '{lead.get('name')}' - {flag}")
+            
             # Check for architect/designer information
             designer = lead.get('designer', '')
             if not designer or designer in ['TBD', 'N/A', '']:
@@ -245,76 +252,216 @@ JSON format:
             validated_leads.append(lead)
             print(f"✅ Project {i}: {lead.get('name')} - {lead.get('project_stage', 'Unknown stage')}")
         
-        if rejected_count > 0:
-            print(f"\n⚠️  Rejected {rejected_count} projects (duplicates, already under construction, or invalid)")
-        
-        print(f"\n✅ Found {len(validated_leads)} validated PRE-BID projects with real sources")
-        return validated_leads
-        
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {e}")
-        print(f"Raw response preview: {raw_content[:500]}...")
-        return []
     except Exception as e:
         print(f"❌ ERROR during AI search: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        # Projects that were fully received and validated before the error are kept
+    
+    if rejected_count > 0:
+        print(f"\n⚠️  Rejected {rejected_count} projects (duplicates, already under construction, or invalid)")
+    LEAD_RULES.print_hit_counts()
+    return validated_leads
 
-def send_to_supabase(leads):
-    if not leads:
-        print("⚠️  No leads to send. Skipping Supabase update.")
-        return
+def get_leads(fanout=False, query_numbers=None):
+    if fanout:
+        return get_leads_fanout(query_numbers)
+
+    print("Step 1: Searching web for Delaware Vertical Construction leads with real-time data...")
     
-    print(f"\nStep 2: Sending {len(leads)} pre-bid leads to Supabase...")
+    raw_chunks = []
+    stream = JSONObjectStream()
     
-    try:
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {SUPABASE_ANON_KEY}"
-        }
-        
-        response = requests.post(
-            WEBHOOK_URL,
-            headers=headers,
-            json={"leads": leads},
-            timeout=30
+    def response_chunks():
+        # Create chat with web search enabled and the system and user messages
+        chat = clients.xai_chat(
+            "grok-4-1-fast",  # Use reasoning model for better search capabilities
+            system_prompt=SYSTEM_PROMPT,
+            user_prompt=USER_PROMPT,
         )
         
-        if response.status_code == 200:
-            print("✅ SUCCESS: Pre-bid intelligence uploaded to Supabase")
-            print("\n📊 Summary of uploaded projects:")
-            for i, lead in enumerate(leads, 1):
-                print(f"  {i}. {lead.get('name')}")
-                print(f"     Stage: {lead.get('project_stage', 'Unknown')}")
-                print(f"     Sector: {lead.get('sector', 'Unknown')}")
-                print(f"     Source: {lead.get('source_url', 'N/A')[:60]}...")
-        else:
-            print(f"❌ FAILED: Status {response.status_code}")
-            print(f"Response: {response.text[:300]}")
-            
-    except requests.exceptions.Timeout:
-        print("❌ ERROR: Request to Supabase timed out after 30 seconds")
+        # Stream the response with web search; each project is validated as
+        # soon as its JSON object closes instead of after the full completion
+        print("🔍 Grok is now searching the web for real projects...")
+        yield from xai_chunks(chat)
+    
+    def recorded_chunks():
+        key = cache_key(model="grok-4-1-fast", messages=[SYSTEM_PROMPT, USER_PROMPT], tools=["web_search"])
+        for chunk in cached_chunks("leads", key, response_chunks, store_if=lambda: not stream.incomplete):
+            raw_chunks.append(chunk)
+            yield chunk
+    
+    # Validation: Check for real URLs and pre-bid status
+    validated_leads = validate_leads(iter_json_objects(recorded_chunks(), stream))
+    
+    raw_content = "".join(raw_chunks)
+    print(f"📄 Received response ({len(raw_content)} characters)")
+    if stream.errors:
+        print(f"⚠️  Skipped {stream.errors} malformed project object(s) in the response")
+    if stream.incomplete:
+        print("⚠️  Response was cut off mid-project; kept every complete project before it")
+    if not validated_leads and raw_content:
+        print(f"Raw response preview: {raw_content[:500]}...")
+    
+    print(f"\n✅ Found {len(validated_leads)} validated PRE-BID projects with real sources")
+    return validated_leads
+
+def _run_query(number, query):
+    # One search query in its own chat session, retried on failure
+    for attempt in range(1, FANOUT_RETRIES + 1):
+        stream = JSONObjectStream()
+        prompt = _query_prompt(query)
+        
+        def response_chunks():
+            chat = clients.xai_chat("grok-4-1-fast", system_prompt=SYSTEM_PROMPT, user_prompt=prompt)
+            yield from xai_chunks(chat)
+        
+        try:
+            key = cache_key(model="grok-4-1-fast", messages=[SYSTEM_PROMPT, prompt], tools=["web_search"])
+            leads = list(iter_json_objects(
+                cached_chunks("leads", key, response_chunks, store_if=lambda: not stream.incomplete), stream
+            ))
+            print(f"🔍 Query {number}: {len(leads)} project(s) for \"{query}\"")
+            return leads
+        except Exception as e:
+            print(f"⚠️  Query {number} attempt {attempt}/{FANOUT_RETRIES} failed: {e}")
+            if attempt < FANOUT_RETRIES:
+                pipeline.record(retries=1)
+                time.sleep(2 ** attempt)
+    return None
+
+def _find_architect(lead):
+    prompt = _architect_prompt(lead)
+    
+    def response_chunks():
+        chat = clients.xai_chat("grok-4-1-fast", user_prompt=prompt)
+        yield from xai_chunks(chat)
+    
+    stream = JSONObjectStream()
+    found = []
+    try:
+        key = cache_key(model="grok-4-1-fast", messages=[prompt], tools=["web_search"])
+        # Read to the end so the finished response gets cached; answers without JSON are not
+        chunks = cached_chunks("architect", key, response_chunks, store_if=lambda: not stream.incomplete and bool(found))
+        for obj in iter_json_objects(chunks, stream):
+            found.append(obj)
     except Exception as e:
-        print(f"❌ ERROR sending to Supabase: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"⚠️  Architect lookup failed for '{lead.get('name')}': {e}")
+        return None
+    return found[0].get('designer') if found else None
+
+def get_leads_fanout(query_numbers=None):
+    queries = [(n, query) for n, query in enumerate(SEARCH_QUERIES, 1) if not query_numbers or n in query_numbers]
+    print(f"Step 1: Running {len(queries)} search queries concurrently ({FANOUT_WORKERS} at a time)...")
+    
+    with ThreadPoolExecutor(max_workers=FANOUT_WORKERS) as pool:
+        results = list(pool.map(lambda item: _run_query(*item), queries))
+    
+    failed = [n for (n, _), leads in zip(queries, results) if leads is None]
+    if failed:
+        print(f"⚠️  Queries {failed} failed; re-run just those with --query " + " --query ".join(map(str, failed)))
+    
+    # Merge in query order through the same validation and dedup as single mode
+    merged = [lead for leads in results if leads for lead in leads]
+    validated_leads = validate_leads(merged)
+    
+    # Stage 2: concurrent architect lookups for projects still missing one
+    missing = [lead for lead in validated_leads if _missing_designer(lead)]
+    if missing:
+        print(f"\n🏗️  Looking up architects for {len(missing)} project(s)...")
+        with ThreadPoolExecutor(max_workers=FANOUT_WORKERS) as pool:
+            designers = list(pool.map(_find_architect, missing))
+        for lead, designer in zip(missing, designers):
+            if designer and not _missing_designer({'designer': designer}):
+                lead['designer'] = designer
+                print(f"🏗️  {lead.get('name')}: Architect: {designer}")
+    
+    print(f"\n✅ Found {len(validated_leads)} validated PRE-BID projects with real sources")
+    return validated_leads
+
+def send_to_supabase(leads, changed=None):
+    # `leads` is every known lead; the delta uploader sends only those Supabase doesn't have yet.
+    # `changed` (this run's new/updated leads) is what the summary lists.
+    headers = {"Authorization": f"Bearer {SUPABASE_ANON_KEY}"}
+    if not leads:
+        print("⚠️  No leads to send. Skipping Supabase update.")
+        uploader.replay_spool(WEBHOOK_URL, "leads", headers)
+        return False
+    
+    changed = leads if changed is None else changed
+    print(f"\nStep 2: Syncing {len(leads)} known pre-bid leads to Supabase ({len(changed)} new or changed this run)...")
+    
+    if not uploader.upload_delta(WEBHOOK_URL, "leads", leads, headers):
+        print("❌ FAILED: Some leads could not be uploaded; failed batches will be retried next run")
+        return False
+    
+    print("✅ SUCCESS: Pre-bid intelligence uploaded to Supabase")
+    print("\n📊 Summary of new or changed projects:")
+    for i, lead in enumerate(changed, 1):
+        print(f"  {i}. {lead.get('name')}")
+        print(f"     Stage: {lead.get('project_stage', 'Unknown')}")
+        print(f"     Sector: {lead.get('sector', 'Unknown')}")
+        print(f"     Source: {lead.get('source_url', 'N/A')[:60]}...")
+    return True
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delaware pre-bid construction lead scout")
+    parser.add_argument("--fanout", action="store_true", default=os.environ.get("SCOUT_MODE") == "fanout",
+                        help="run each search query as its own concurrent chat (or set SCOUT_MODE=fanout)")
+    parser.add_argument("--query", type=int, action="append", dest="queries",
+                        help="fan-out mode: only run this SEARCH_QUERIES number (repeatable)")
+    response_cache.add_arguments(parser)
+    uploader.add_arguments(parser)
+    pipeline.add_arguments(parser)
+    args = parser.parse_args()
+    response_cache.configure(args)
+    uploader.configure(args)
+    
     print("=" * 60)
     print("Delaware Pre-Bid Construction Intelligence Finder")
     print("=" * 60)
     
-    new_leads = get_leads()
-    
-    if new_leads:
-        print(f"\n{'=' * 60}")
-        print(f"🎯 Found {len(new_leads)} early-stage opportunities")
-        print(f"{'=' * 60}")
-        send_to_supabase(new_leads)
-    else:
-        print("\n⚠️  No projects found - consider adjusting search parameters")
-        print("Recommendations:")
-        print("  • Check if xAI API key has web search permissions")
-        print("  • Try broadening search to include more Delaware counties")
-        print("  • Adjust date ranges in search queries")
+    run = Pipeline("leads", profile=args.profile)
+    try:
+        # Search and validation are interleaved: leads are validated as they stream in
+        with run.stage("search") as stage:
+            new_leads = get_leads(fanout=args.fanout or bool(args.queries), query_numbers=args.queries)
+            stage.items_out = len(new_leads)
+        
+        if new_leads:
+            print(f"\n{'=' * 60}")
+            print(f"🎯 Found {len(new_leads)} early-stage opportunities")
+            print(f"{'=' * 60}")
+            
+            # Every lead's designer is linked, so architect lookups don't need another search
+            registry = FirmRegistry()
+            try:
+                with run.stage("link", items_in=len(new_leads)) as stage:
+                    stage.items_out = registry.link_leads(new_leads)
+            finally:
+                registry.close()
+            
+            # The lead history is saved straight away; what Supabase has accepted is tracked
+            # by the upload manifest, keyed by lead id, so only new or changed leads (and
+            # any a failed run left behind) are sent and a renamed project stays one row.
+            store = LeadStore()
+            try:
+                with run.stage("dedup", items_in=len(new_leads)) as stage:
+                    changed_leads = store.classify(new_leads)
+                    store.commit()
+                    stage.items_out = len(changed_leads)
+                with run.stage("upload", items_in=len(changed_leads)) as stage:
+                    if not changed_leads:
+                        print("✅ No new or changed projects since the last run")
+                    delivered = send_to_supabase(store.known_leads(), changed_leads)
+                    stage.items_out = len(changed_leads) if delivered else 0
+            finally:
+                store.close()
+        else:
+            print("\n⚠️  No projects found - consider adjusting search parameters")
+            print("Recommendations:")
+            print("  • Check if xAI API key has web search permissions")
+            print("  • Try broadening search to include more Delaware counties")
+            print("  • Adjust date ranges in search queries")
+    finally:
+        run.finish()
@@ -0,0 +1,16 @@
+import os
+import sqlite3
+
+# Local state that survives between runs (feed cache, seen articles, ...).
+# The GitHub workflows persist this directory with actions/cache.
+CACHE_DIR = os.environ.get("SCOUT_CACHE_DIR", ".scout_cache")
+# State shared by all three scouts (the firm registry); the workflows persist
+# it under one cache key instead of one per scout
+SHARED_DIR = os.environ.get("SCOUT_SHARED_DIR", ".scout_shared")
+
+def connect(name, directory=None, **kwargs):
+    directory = directory or CACHE_DIR
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(directory, f"{name}.db"), **kwargs)
+    conn.row_factory = sqlite3.Row
+    return conn
@@ -0,0 +1,37 @@
+import re
+
+# Normalization and trigram similarity shared by the lead store and firm registry
+
+ADDRESS_ABBREVIATIONS = {
+    "street": "st", "road": "rd", "avenue": "ave", "boulevard": "blvd", "drive": "dr",
+    "lane": "ln", "highway": "hwy", "route": "rt", "court": "ct", "place": "pl",
+    "parkway": "pkwy", "pike": "pk", "north": "n", "south": "s", "east": "e", "west": "w",
+}
+PLACEHOLDER_ADDRESSES = {"", "site location tbd", "site tbd", "tbd", "n a", "unknown"}
+
+def normalize_text(text):
+    text = re.sub(r"[^\w\s]", " ", str(text or "").lower())
+    return re.sub(r"\s+", " ", text).strip()
+
+def normalize_address(address):
+    words = normalize_text(address).split()
+    normalized = " ".join(ADDRESS_ABBREVIATIONS.get(word, word) for word in words)
+    return "" if normalized in PLACEHOLDER_ADDRESSES else normalized
+
+def trigrams(text):
+    text = f"  {normalize_text(text)} "
+    return {text[i:i + 3] for i in range(len(text) - 2)} if text.strip() else set()
+
+def numbers_conflict(a, b):
+    # "Building 1" and "Building 2" look alike as trigrams but are different projects
+    a_numbers = set(re.findall(r"\d+", str(a or "")))
+    b_numbers = set(re.findall(r"\d+", str(b or "")))
+    return bool(a_numbers and b_numbers and a_numbers != b_numbers)
+
+def similarity(a, b):
+    # Jaccard similarity of character trigrams, 0.0 - 1.0
+    a_grams = a if isinstance(a, set) else trigrams(a)
+    b_grams = b if isinstance(b, set) else trigrams(b)
+    if not a_grams or not b_grams:
+        return 0.0
+    return len(a_grams & b_grams) / len(a_grams | b_grams)
@@ -0,0 +1,149 @@
+import os
+import glob
+import gzip
+import json
+import time
+import random
+import storage
+import pipeline
+from manifest import Manifest
+
+# Shared webhook uploader: one pooled session, retries with exponential backoff
+# and jitter, batching, optional gzip bodies, and a spool of failed batches
+# that is replayed on the next run.
+UPLOAD_BATCH_SIZE = int(os.environ.get("SCOUT_UPLOAD_BATCH_SIZE", "100"))
+UPLOAD_RETRIES = int(os.environ.get("SCOUT_UPLOAD_RETRIES", "4"))
+UPLOAD_TIMEOUT = float(os.environ.get("SCOUT_UPLOAD_TIMEOUT", "30"))
+UPLOAD_BACKOFF = float(os.environ.get("SCOUT_UPLOAD_BACKOFF", "1.0"))
+UPLOAD_GZIP = os.environ.get("SCOUT_UPLOAD_GZIP", "0") == "1"
+SPOOL_DIR = os.path.join(storage.CACHE_DIR, "spool")
+# Send every record instead of only what changed since the last delivery
+FULL_RESYNC = os.environ.get("SCOUT_FULL_RESYNC", "0") == "1"
+# Channels whose uploads also carry tombstones for records that disappeared, e.g. "firms"
+UPLOAD_TOMBSTONES = set(filter(None, os.environ.get("SCOUT_UPLOAD_TOMBSTONES", "").split(",")))
+
+# Status codes worth retrying; other 4xx responses won't get better on their own
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+_session = None
+
+def get_session():
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4)
+        _session.mount("https://", adapter)
+        _session.mount("http://", adapter)
+    return _session
+
+def post_json(url, payload, headers=None, gzip_body=UPLOAD_GZIP):
+    # POSTs one payload, retrying transient failures; returns the last response or raises the last error
+    import requests
+    body = json.dumps(payload).encode("utf-8")
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    if gzip_body:
+        body = gzip.compress(body)
+        headers["Content-Encoding"] = "gzip"
+
+    for attempt in range(1, UPLOAD_RETRIES + 1):
+        pipeline.record(bytes=len(body), retries=1 if attempt > 1 else 0)
+        try:
+            response = get_session().post(url, data=body, headers=headers, timeout=UPLOAD_TIMEOUT)
+            if response.status_code not in RETRY_STATUSES or attempt == UPLOAD_RETRIES:
+                return response
+            reason = f"status {response.status_code}"
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == UPLOAD_RETRIES:
+                raise
+            reason = str(e)
+        # Full jitter so parallel runs don't retry in lockstep
+        delay = random.uniform(0, UPLOAD_BACKOFF * 2 ** attempt)
+        print(f"↻ Upload attempt {attempt}/{UPLOAD_RETRIES} failed ({reason}); retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+def _batches(records, batch_size):
+    for start in range(0, len(records), batch_size):
+        yield records[start:start + batch_size]
+
+def _spool(key, payload):
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    path = os.path.join(SPOOL_DIR, f"{key}-{time.time_ns()}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f)
+    print(f"💾 Spooled {_payload_size(key, payload)} {key} for the next run: {path}")
+
+def _payload_size(key, payload):
+    return len(payload.get(key, [])) + len(payload.get("deleted", []))
+
+def _send_payload(url, payload, headers, gzip_body):
+    try:
+        response = post_json(url, payload, headers, gzip_body)
+    except Exception as e:
+        print(f"❌ Upload error: {e}")
+        return False
+    if not response.ok:
+        print(f"❌ Upload failed: status {response.status_code}: {response.text[:300]}")
+    return response.ok
+
+def replay_spool(url, key, headers=None, gzip_body=UPLOAD_GZIP):
+    # Re-sends batches left over from earlier failed runs; returns the number delivered
+    delivered = 0
+    for path in sorted(glob.glob(os.path.join(SPOOL_DIR, f"{key}-*.json"))):
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        # Older spool files hold just the list of records
+        if isinstance(payload, list):
+            payload = {key: payload}
+        if not _send_payload(url, payload, headers, gzip_body):
+            print(f"⚠️  Spooled batch {os.path.basename(path)} still failing; keeping it")
+            break
+        os.remove(path)
+        delivered += _payload_size(key, payload)
+    if delivered:
+        print(f"📤 Replayed {delivered} spooled {key}")
+    return delivered
+
+def upload_delta(url, key, records, headers=None, full_resync=None, tombstones=None,
+                 batch_size=UPLOAD_BATCH_SIZE, gzip_body=UPLOAD_GZIP):
+    # Sends the records that are new or changed since the last delivery on this
+    # channel (plus tombstones, if enabled) in batches of
+    # {key: [...], "deleted": [identity, ...], "sync": "delta" | "full"}. Returns True
+    # if every batch was accepted; failed batches are spooled and replayed next run.
+    # The manifest is updated batch by batch, only once the webhook accepts it; a
+    # spooled batch is replayed next run and its records are simply diffed again.
+    full_resync = FULL_RESYNC if full_resync is None else full_resync
+    tombstones = key in UPLOAD_TOMBSTONES if tombstones is None else tombstones
+    sync = "full" if full_resync else "delta"
+    replay_spool(url, key, headers, gzip_body)
+
+    manifest = Manifest(key)
+    try:
+        upserts, deletes, unchanged = manifest.diff(records, full=full_resync, tombstones=tombstones)
+        print(f"🔁 {key} {sync}: {len(upserts)} to send, {unchanged} unchanged, {len(deletes)} removed")
+        delivered = True
+        for batch in _batches(upserts, max(1, batch_size)):
+            payload = {key: [record for _, _, record in batch], "sync": sync}
+            if _send_payload(url, payload, headers, gzip_body):
+                manifest.mark_delivered(batch)
+            else:
+                _spool(key, payload)
+                delivered = False
+        for batch in _batches(deletes, max(1, batch_size)):
+            payload = {key: [], "deleted": [ident for _, ident in batch], "sync": sync}
+            if _send_payload(url, payload, headers, gzip_body):
+                manifest.mark_deleted(batch)
+            else:
+                _spool(key, payload)
+                delivered = False
+        return delivered
+    finally:
+        manifest.close()
+
+def add_arguments(parser):
+    parser.add_argument("--full-resync", action="store_true",
+                        help="upload every record, not just those changed since the last delivery")
+
+def configure(args):
+    global FULL_RESYNC
+    FULL_RESYNC = FULL_RESYNC or args.full_resync